@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, Tuple, TypeVar
+
+from app.metrics import inference_batch_size, inference_batch_wait_seconds
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects items from many sessions and runs them through one batched call.
+
+    An item that finds nothing else queued runs straight away, so a single
+    session never waits. When other items are already queued, the batch is
+    flushed as soon as it holds `max_batch` items or the oldest item has
+    waited `max_wait` seconds, whichever comes first. Each caller gets back a
+    Future resolved with its own entry of the batch result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[T]], List[R]],
+        max_batch: int,
+        max_wait: float,
+    ) -> None:
+        self.name = name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._run_batch = run_batch
+        self._queue: "queue.Queue[Tuple[T, Future, float]]" = queue.Queue()
+        self._batch_size = inference_batch_size.labels(name)
+        self._batch_wait = inference_batch_wait_seconds.labels(name)
+        self._thread = threading.Thread(
+            target=self._loop,
+            name=f"batcher-{name}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, item: T) -> "Future[R]":
+        future: "Future[R]" = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> List[Tuple[T, Future, float]]:
+        first = self._queue.get()
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1:
+            return batch
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._batch_size.observe(len(batch))
+            for _, _, enqueued in batch:
+                self._batch_wait.observe(started - enqueued)
+
+            pending = [(item, future) for item, future, _ in batch if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            try:
+                results = self._run_batch([item for item, _ in pending])
+            except Exception as exc:
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(pending, results):
+                future.set_result(result)
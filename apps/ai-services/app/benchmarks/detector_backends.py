@@ -0,0 +1,129 @@
+"""Latency and detection agreement of ONNX detectors against the torch path.
+
+Runs every frame in a folder through the ultralytics weights and each ONNX
+variant, then reports per-frame latency and how well the ONNX detections
+match the torch ones (IoU >= --iou, greedy by confidence).
+
+Usage:
+    python -m app.benchmarks.detector_backends samples/cards \\
+        --torch models/card.pt --onnx models/card.onnx --onnx models/card.int8.onnx --conf 0.8
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.tools.detections import boxes_from_result
+from app.tools.model_backend import BACKEND_TORCH, backend_for_path, load_detector
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def _iou(box: np.ndarray, others: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], others[:, 0])
+    y1 = np.maximum(box[1], others[:, 1])
+    x2 = np.minimum(box[2], others[:, 2])
+    y2 = np.minimum(box[3], others[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    other_area = (others[:, 2] - others[:, 0]) * (others[:, 3] - others[:, 1])
+    return inter / np.maximum(area + other_area - inter, 1e-6)
+
+
+def _match(reference: np.ndarray, candidate: np.ndarray, threshold: float) -> tuple[int, list[float]]:
+    matched = 0
+    ious: list[float] = []
+    used = np.zeros(len(candidate), dtype=bool)
+    for box in reference:
+        if len(candidate) == 0:
+            break
+        overlaps = _iou(box, candidate)
+        overlaps[used] = 0.0
+        index = int(overlaps.argmax())
+        if overlaps[index] >= threshold:
+            used[index] = True
+            matched += 1
+            ious.append(float(overlaps[index]))
+    return matched, ious
+
+
+def _run(model, frames: list[np.ndarray], conf: float) -> tuple[list, list[float]]:
+    model(frames[0], conf=conf, verbose=False)
+    outputs = []
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        results = model(frame, conf=conf, verbose=False)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        outputs.append(boxes_from_result(results[0] if results else None))
+    return outputs, latencies
+
+
+def _latency_line(name: str, latencies: list[float]) -> str:
+    values = np.array(latencies)
+    return (
+        f"{name:<28} mean {values.mean():7.2f} ms  p50 {np.percentile(values, 50):7.2f} ms  "
+        f"p95 {np.percentile(values, 95):7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("frames", type=Path, help="folder of sample frames")
+    parser.add_argument("--torch", type=Path, required=True, help="ultralytics .pt weights (reference)")
+    parser.add_argument("--onnx", type=Path, action="append", default=[], help="ONNX weights to compare")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = [
+        image
+        for image in (
+            cv2.imread(str(path), cv2.IMREAD_COLOR)
+            for path in sorted(args.frames.iterdir())
+            if path.suffix.lower() in IMAGE_SUFFIXES
+        )
+        if image is not None
+    ]
+    if not frames:
+        raise SystemExit(f"No frames found in {args.frames}")
+
+    reference_model = load_detector(args.torch, args.device, BACKEND_TORCH)
+    reference, latencies = _run(reference_model, frames, args.conf)
+    print(f"{len(frames)} frames, conf={args.conf}, match IoU>={args.iou}")
+    print(_latency_line(f"torch ({args.torch.name})", latencies))
+
+    reference_total = sum(len(boxes) for boxes, _ in reference)
+    for onnx_path in args.onnx:
+        model = load_detector(onnx_path, args.device, backend_for_path(onnx_path))
+        outputs, latencies = _run(model, frames, args.conf)
+        print(_latency_line(onnx_path.name, latencies))
+
+        matched = 0
+        candidate_total = 0
+        ious: list[float] = []
+        conf_deltas: list[float] = []
+        for (ref_boxes, ref_conf), (boxes, conf) in zip(reference, outputs):
+            candidate_total += len(boxes)
+            frame_matched, frame_ious = _match(ref_boxes, boxes, args.iou)
+            matched += frame_matched
+            ious.extend(frame_ious)
+            if len(ref_conf) and len(conf):
+                conf_deltas.append(abs(float(ref_conf.max()) - float(conf.max())))
+        recall = matched / reference_total if reference_total else 1.0
+        precision = matched / candidate_total if candidate_total else 1.0
+        mean_iou = float(np.mean(ious)) if ious else 0.0
+        mean_conf_delta = float(np.mean(conf_deltas)) if conf_deltas else 0.0
+        print(
+            f"{'':<28} agreement: recall {recall:.3f}  precision {precision:.3f}  "
+            f"mean IoU {mean_iou:.3f}  |top conf delta| {mean_conf_delta:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
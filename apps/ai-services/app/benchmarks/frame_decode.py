@@ -0,0 +1,99 @@
+"""Per-frame cost of turning a websocket frame into the frame the models see.
+
+For each source width the same picture is encoded as JPEG and as raw
+RGBA / I420 frames, then timed through:
+  full     imdecode(IMREAD_COLOR) + resize to --max-width (previous path)
+  reduced  decode_frame(), which picks IMREAD_REDUCED_COLOR_2/4/8, + resize
+  rgba     raw RGBA frame -> BGR + resize
+  i420     raw I420 frame -> BGR + resize
+
+Usage:
+    python -m app.benchmarks.frame_decode [--image samples/card.jpg] [--max-width 640]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from app.decode import (
+    RAW_FORMAT_I420,
+    RAW_FORMAT_RGBA,
+    RAW_FRAME_HEADER,
+    RAW_FRAME_MAGIC,
+    decode_frame,
+)
+
+WIDTHS = (640, 1280, 1920, 2560, 3840)
+
+
+def _source(image_path: Optional[Path], width: int) -> np.ndarray:
+    height = width * 9 // 16
+    if image_path is not None:
+        image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+        if image is None:
+            raise SystemExit(f"Cannot read {image_path}")
+        return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    # Smooth gradients plus mild noise compress roughly like a camera frame.
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = np.random.default_rng(0).normal(0, 6, base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def _fit(frame: np.ndarray, max_width: int) -> np.ndarray:
+    height, width = frame.shape[:2]
+    if width <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, int(height * max_width / width)))
+
+
+def _time(fn: Callable[[], np.ndarray], runs: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", type=Path, help="picture to scale to each width (synthetic if omitted)")
+    parser.add_argument("--max-width", type=int, default=1280, help="target width after decoding")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"target width {args.max_width}, JPEG quality {args.quality}, {args.runs} runs (ms per frame)")
+    print(f"{'source':>11} {'jpeg KB':>8} {'full':>8} {'reduced':>8} {'rgba':>8} {'i420':>8}")
+    for width in WIDTHS:
+        image = _source(args.image, width)
+        height = image.shape[0]
+        _, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), args.quality])
+        jpeg = encoded.tobytes()
+        rgba = RAW_FRAME_HEADER.pack(RAW_FRAME_MAGIC, RAW_FORMAT_RGBA, width, height) + cv2.cvtColor(
+            image, cv2.COLOR_BGR2RGBA
+        ).tobytes()
+        i420 = RAW_FRAME_HEADER.pack(RAW_FRAME_MAGIC, RAW_FORMAT_I420, width, height) + cv2.cvtColor(
+            image, cv2.COLOR_BGR2YUV_I420
+        ).tobytes()
+
+        timings = [
+            _time(lambda: _fit(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR), args.max_width), args.runs),
+            _time(lambda: _fit(decode_frame(jpeg, args.max_width), args.max_width), args.runs),
+            _time(lambda: _fit(decode_frame(rgba, args.max_width), args.max_width), args.runs),
+            _time(lambda: _fit(decode_frame(i420, args.max_width), args.max_width), args.runs),
+        ]
+        print(
+            f"{width:>5}x{height:<5} {len(jpeg) / 1024:8.0f} "
+            + " ".join(f"{value:8.2f}" for value in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Per-frame latency of the live face-validation pipeline, before and after.
+
+"two-pass" is the previous path: YOLO face detection on the frame, then a
+padded crop through InsightFace, which runs SCRFD again before ArcFace.
+"single-pass" runs SCRFD once on the frame and feeds its landmarks
+straight to ArcFace (`detect_live_faces` + `embed_live_face`).
+"tracked" adds ROI tracking: frames are treated as a sequence, SCRFD searches
+around the previous face and runs on the full frame every
+FACE_TRACK_FULL_EVERY frames or when the region misses.
+
+Usage:
+    python -m app.benchmarks.live_face samples/selfies [--runs 3]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.tools.face_validation import (
+    FACE_TRACK_FULL_EVERY,
+    LIVE_FACE_CONF_THRES,
+    PADDING_RATIO,
+    _detect_live_faces_scrfd,
+    crop_face_from_bbox,
+    detect_faces_yolo,
+    embed_live_face,
+    get_best_face,
+    get_face_model,
+    get_insightface_app,
+    live_face_roi,
+    resize_frame,
+)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def _two_pass(frame: np.ndarray) -> bool:
+    faces = detect_faces_yolo(frame, get_face_model(), conf_threshold=LIVE_FACE_CONF_THRES)
+    if not faces:
+        return False
+    best = faces.best()
+    crop = crop_face_from_bbox(frame, best["bbox"], PADDING_RATIO)
+    return crop is not None and get_best_face(get_insightface_app(), crop) is not None
+
+
+def _single_pass(frame: np.ndarray) -> bool:
+    faces = _detect_live_faces_scrfd(frame, get_insightface_app())
+    if not faces:
+        return False
+    best = faces.best()
+    return embed_live_face(frame, best) is not None
+
+
+class _Tracked:
+    def __init__(self) -> None:
+        self.bbox = None
+        self.since_full = 0
+
+    def __call__(self, frame: np.ndarray) -> bool:
+        app = get_insightface_app()
+        faces = []
+        if self.bbox is not None and self.since_full < FACE_TRACK_FULL_EVERY:
+            height, width = frame.shape[:2]
+            faces = _detect_live_faces_scrfd(frame, app, live_face_roi(self.bbox, width, height))
+            self.since_full += int(bool(faces))
+        if not faces:
+            faces = _detect_live_faces_scrfd(frame, app)
+            self.since_full = 0
+        if not faces:
+            self.bbox = None
+            return False
+        best = faces.best()
+        self.bbox = best["bbox"]
+        return embed_live_face(frame, best) is not None
+
+
+def _measure(fn, frames: list[np.ndarray], runs: int) -> tuple[list[float], int]:
+    fn(frames[0])
+    latencies = []
+    embedded = 0
+    for _ in range(runs):
+        for frame in frames:
+            start = time.perf_counter()
+            embedded += int(fn(frame))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies, embedded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("frames", type=Path, help="folder of selfie frames (consecutive video frames for tracking)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = []
+    for path in sorted(args.frames.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is not None:
+            frames.append(resize_frame(image))
+    if not frames:
+        raise SystemExit(f"No frames found in {args.frames}")
+
+    print(f"{len(frames)} frames x {args.runs} runs")
+    modes = (
+        ("two-pass (YOLO + SCRFD)", _two_pass),
+        ("single-pass (SCRFD)", _single_pass),
+        ("tracked (SCRFD + ROI)", _Tracked()),
+    )
+    for name, fn in modes:
+        latencies, embedded = _measure(fn, frames, args.runs)
+        values = np.array(latencies)
+        print(
+            f"{name:<26} mean {values.mean():7.2f} ms  p50 {np.percentile(values, 50):7.2f} ms  "
+            f"p95 {np.percentile(values, 95):7.2f} ms  embedded {embedded}/{len(latencies)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark for the card-face rotation search geometry.
+
+Compares the per-lock CPU spent rotating the card crop and locating its
+content box: warpAffine + pixel-mask `content_bbox` for every angle versus
+`rotate_for_search` (lossless quadrant rotations, analytic content box).
+Model inference is not included.
+
+Usage:
+    python -m app.benchmarks.rotation_geometry [--image card.jpg] [--width 960] [--runs 50]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.tools.face_validation import (
+    FACE_ROTATION_STEP_DEG,
+    content_bbox,
+    rotate_for_search,
+    rotate_image,
+)
+
+
+def _load_card(path: str | None, width: int) -> np.ndarray:
+    if path:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise SystemExit(f"Could not read {path}")
+        scale = width / image.shape[1]
+        return cv2.resize(image, (width, int(image.shape[0] * scale)))
+    height = int(width / 1.58)
+    rng = np.random.default_rng(0)
+    return rng.integers(20, 255, (height, width, 3), dtype=np.uint8)
+
+
+def _legacy(card: np.ndarray) -> None:
+    for angle in range(0, 360, FACE_ROTATION_STEP_DEG):
+        content_bbox(rotate_image(card, angle))
+
+
+def _geometry(card: np.ndarray) -> None:
+    for angle in range(0, 360, FACE_ROTATION_STEP_DEG):
+        rotate_for_search(card, angle)
+
+
+def _time(fn, card: np.ndarray, runs: int) -> float:
+    fn(card)
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(card)
+    return (time.perf_counter() - start) / runs * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="card crop to rotate (defaults to a synthetic card)")
+    parser.add_argument("--width", type=int, default=960, help="card crop width in pixels")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    card = _load_card(args.image, args.width)
+    legacy_ms = _time(_legacy, card, args.runs)
+    geometry_ms = _time(_geometry, card, args.runs)
+    print(f"card crop: {card.shape[1]}x{card.shape[0]}, {360 // FACE_ROTATION_STEP_DEG} angles")
+    print(f"warpAffine + content_bbox : {legacy_ms:8.2f} ms/lock")
+    print(f"rotate_for_search         : {geometry_ms:8.2f} ms/lock")
+    print(f"saved                     : {legacy_ms - geometry_ms:8.2f} ms/lock")
+
+
+if __name__ == "__main__":
+    main()
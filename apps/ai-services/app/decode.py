@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import struct
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Raw frames: 10-byte little-endian header (magic, pixel format, pad, width, height), then pixels.
+RAW_FRAME_MAGIC = b"EFR1"
+RAW_FRAME_HEADER = struct.Struct("<4sBxHH")
+RAW_FORMAT_GRAY = 1
+RAW_FORMAT_RGBA = 2
+RAW_FORMAT_I420 = 3
+RAW_FORMATS = {"gray": RAW_FORMAT_GRAY, "rgba": RAW_FORMAT_RGBA, "i420": RAW_FORMAT_I420}
+FRAME_FORMATS = ["jpeg", *RAW_FORMATS]
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# SOF0-SOF15 carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the JPEG frame header, without decoding any pixels."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    index = 2
+    length = len(data)
+    while index + 9 < length:
+        if data[index] != 0xFF:
+            return None
+        marker = data[index + 1]
+        if marker == 0xFF:
+            index += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            index += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[index + 5 : index + 9])
+            return width, height
+        index += 2 + int.from_bytes(data[index + 2 : index + 4], "big")
+    return None
+
+
+def decode_raw_frame(data: bytes) -> Optional[np.ndarray]:
+    if len(data) < RAW_FRAME_HEADER.size:
+        return None
+    magic, pixel_format, width, height = RAW_FRAME_HEADER.unpack_from(data)
+    if magic != RAW_FRAME_MAGIC or not width or not height:
+        return None
+    pixels = np.frombuffer(data, np.uint8, offset=RAW_FRAME_HEADER.size)
+
+    if pixel_format == RAW_FORMAT_GRAY and pixels.size == width * height:
+        return cv2.cvtColor(pixels.reshape(height, width), cv2.COLOR_GRAY2BGR)
+    if pixel_format == RAW_FORMAT_RGBA and pixels.size == width * height * 4:
+        return cv2.cvtColor(pixels.reshape(height, width, 4), cv2.COLOR_RGBA2BGR)
+    even = width % 2 == 0 and height % 2 == 0
+    if pixel_format == RAW_FORMAT_I420 and even and pixels.size == width * height * 3 // 2:
+        return cv2.cvtColor(pixels.reshape(height * 3 // 2, width), cv2.COLOR_YUV2BGR_I420)
+    return None
+
+
+def reduced_decode_flag(width: int, max_width: int) -> int:
+    """Largest libjpeg DCT downscale that still leaves at least `max_width` columns."""
+    for factor, flag in _REDUCED_FLAGS:
+        if width // factor >= max_width:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_frame(data: bytes, max_width: int) -> Optional[np.ndarray]:
+    """Decode a websocket frame (JPEG/PNG or raw) to BGR, at no more than the needed scale.
+
+    JPEGs wider than `max_width` are decoded with IMREAD_REDUCED_COLOR_2/4/8
+    when the reduced image is still at least `max_width` wide, so the
+    follow-up resize starts from far fewer pixels.
+    """
+    if data[:4] == RAW_FRAME_MAGIC:
+        return decode_raw_frame(data)
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(data)
+    if size is not None and max_width > 0:
+        flag = reduced_decode_flag(size[0], max_width)
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flag)
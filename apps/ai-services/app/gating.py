@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+from app.metrics import frame_gate_by_result
+
+FRAME_GATE = os.getenv("FRAME_GATE", "on").strip().lower() == "on"
+FRAME_GATE_DIFF_THRESHOLD = float(os.getenv("FRAME_GATE_DIFF_THRESHOLD", "1.5"))
+FRAME_GATE_MAX_SKIPS = int(os.getenv("FRAME_GATE_MAX_SKIPS", "5"))
+FRAME_GATE_THUMB_SIZE = 32
+
+
+class FrameGate:
+    """Per-session check for frames that would not change the last model result.
+
+    Byte-identical frames are caught before decoding; otherwise a tiny
+    grayscale thumbnail is compared against the last frame that went through
+    the model (not the previous frame, so slow drift still adds up). At most
+    FRAME_GATE_MAX_SKIPS frames in a row reuse a result.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._digest: Optional[bytes] = None
+        self._thumbnail: Optional[np.ndarray] = None
+        self._pending_thumbnail: Optional[np.ndarray] = None
+        self._skips = 0
+        self.frame: Optional[np.ndarray] = None
+        self.stage: Optional[str] = None
+        self.result: Any = None
+
+    def _can_skip(self, stage: str) -> bool:
+        return (
+            FRAME_GATE
+            and self.result is not None
+            and self.stage == stage
+            and self._skips < FRAME_GATE_MAX_SKIPS
+        )
+
+    def is_duplicate(self, frame_bytes: bytes, stage: str) -> bool:
+        digest = hashlib.blake2b(frame_bytes, digest_size=16).digest()
+        duplicate = digest == self._digest and self.frame is not None and self._can_skip(stage)
+        self._digest = digest
+        if duplicate:
+            self._skip("duplicate")
+        return duplicate
+
+    def is_unchanged(self, frame: np.ndarray, stage: str) -> bool:
+        if not FRAME_GATE:
+            return False
+        small = cv2.resize(frame, (FRAME_GATE_THUMB_SIZE, FRAME_GATE_THUMB_SIZE), interpolation=cv2.INTER_AREA)
+        thumbnail = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        self._pending_thumbnail = thumbnail
+        if not self._can_skip(stage) or self._thumbnail is None:
+            return False
+        if float(cv2.absdiff(thumbnail, self._thumbnail).mean()) >= FRAME_GATE_DIFF_THRESHOLD:
+            return False
+        self._skip("unchanged")
+        return True
+
+    def processed(self, frame: np.ndarray, stage: str, result: Any) -> None:
+        frame_gate_by_result["processed"].inc()
+        self.frame = frame
+        self.stage = stage
+        self.result = result
+        self._thumbnail = self._pending_thumbnail
+        self._skips = 0
+
+    def _skip(self, reason: str) -> None:
+        frame_gate_by_result[reason].inc()
+        self._skips += 1
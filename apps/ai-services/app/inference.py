@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Optional, TypeVar
+
+from app.metrics import inference_queue_depth, inference_queue_wait_seconds
+
+T = TypeVar("T")
+
+INFERENCE_WORKERS = int(os.getenv("AI_INFERENCE_WORKERS", "4"))
+INFERENCE_MAX_PENDING = int(os.getenv("AI_INFERENCE_MAX_PENDING", "32"))
+BACKGROUND_WORKERS = int(os.getenv("AI_BACKGROUND_WORKERS", "2"))
+SPECULATIVE_WORKERS = int(os.getenv("AI_SPECULATIVE_WORKERS", "1"))
+SPECULATIVE_MAX_PENDING = int(os.getenv("AI_SPECULATIVE_MAX_PENDING", "2"))
+
+
+class InferenceExecutor:
+    """Bounded thread pool shared by every websocket session on this worker.
+
+    Model calls (torch / onnxruntime) release the GIL, so running them on a
+    small pool keeps the event loop free for other sockets and `/metrics`.
+    `max_pending` caps how many submissions may wait for a thread; callers
+    beyond that wait on the event loop instead of piling up in the pool.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+        return self._slots
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        slots = self._get_slots()
+        enqueued = time.perf_counter()
+        inference_queue_depth.inc()
+        queued = True
+        queued_lock = threading.Lock()
+
+        def _dequeue() -> bool:
+            nonlocal queued
+            with queued_lock:
+                if not queued:
+                    return False
+                queued = False
+            inference_queue_depth.dec()
+            return True
+
+        def _call() -> T:
+            if _dequeue():
+                inference_queue_wait_seconds.observe(time.perf_counter() - enqueued)
+            return fn(*args)
+
+        try:
+            async with slots:
+                loop = asyncio.get_running_loop()
+                # Like asyncio.to_thread: context variables (frame timings) follow the job.
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(self._pool, context.run, _call)
+        finally:
+            _dequeue()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_inference_executor() -> InferenceExecutor:
+    return InferenceExecutor(INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
+
+
+async def run_inference(fn: Callable[..., T], *args: Any) -> T:
+    return await get_inference_executor().run(fn, *args)
+
+
+@lru_cache(maxsize=1)
+def get_background_pool() -> ThreadPoolExecutor:
+    # Separate from the inference executor so frame handlers can block on background
+    # results without starving the threads those results need.
+    return ThreadPoolExecutor(
+        max_workers=max(1, BACKGROUND_WORKERS),
+        thread_name_prefix="background",
+    )
+
+
+def submit_background(fn: Callable[..., T], *args: Any) -> "Future[T]":
+    return get_background_pool().submit(fn, *args)
+
+
+class BoundedPool:
+    """Thread pool that refuses work beyond `max_pending` queued or running jobs.
+
+    Used for speculative jobs: they must never delay the background pool's
+    real work, and when this pool is busy skipping the guess is cheaper
+    than queueing it.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, name: str) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=name)
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Optional["Future[T]"]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, _: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+@lru_cache(maxsize=1)
+def get_speculative_pool() -> BoundedPool:
+    return BoundedPool(SPECULATIVE_WORKERS, SPECULATIVE_MAX_PENDING, "speculative")
+
+
+def submit_speculative(fn: Callable[..., T], *args: Any) -> Optional["Future[T]"]:
+    """Run `fn` on the speculative pool, or return None when it is already at its cap."""
+    return get_speculative_pool().submit(fn, *args)
@@ -0,0 +1,425 @@
+"""Inference-server mode: model-owning processes fed through shared memory.
+
+With AI_INFERENCE_SERVER=on each API worker starts its own card processes
+(card detector) and face processes (live face detection and embedding,
+card-face extraction), so the API process only decodes frames, runs the
+session state machine and serializes replies. A model call copies the
+frame into a free slot of a shared-memory ring and queues a small
+descriptor (request id, method, slot, shape, arguments); the server wraps
+the slot in a numpy array and replies with the FrameDetection, Detections
+or embedding. An image result (the card face crop) is written back into
+the same slot, so pixels never go through pickle.
+"""
+from __future__ import annotations
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import lru_cache
+from multiprocessing import connection
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import mark_process_dead
+from app.resolution import ladder
+from app.timing import span
+
+INFERENCE_SERVER = os.getenv("AI_INFERENCE_SERVER", "off").strip().lower() == "on"
+CARD_PROCESSES = int(os.getenv("AI_INFERENCE_CARD_PROCESSES", "1"))
+FACE_PROCESSES = int(os.getenv("AI_INFERENCE_FACE_PROCESSES", "1"))
+SHM_SLOTS = int(os.getenv("AI_SHM_SLOTS", "8"))
+SHM_SLOT_MB = float(os.getenv("AI_SHM_SLOT_MB", "9"))
+INFERENCE_TIMEOUT_SEC = float(os.getenv("AI_INFERENCE_TIMEOUT_SEC", "10"))
+PARENT_CHECK_SEC = 1.0
+
+KIND_CARD = "card"
+KIND_FACE = "face"
+KIND_MODELS = {KIND_CARD: ("card",), KIND_FACE: ("face", "insightface")}
+METHOD_KINDS = {
+    "card": KIND_CARD,
+    "faces": KIND_FACE,
+    "embed": KIND_FACE,
+    "card_face": KIND_FACE,
+    "card_embedding": KIND_FACE,
+}
+# Methods whose result tuple starts with an image, returned through the slot.
+IMAGE_METHODS = {"card_face"}
+
+# True inside a model-owning process, where the tool functions run locally.
+_in_server = False
+
+Request = Tuple[int, str, int, Tuple[int, ...], int, tuple]
+
+
+class FrameRing:
+    """Fixed-size uint8 image slots in one shared-memory block."""
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None) -> None:
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            try:
+                # Python 3.13+: the creating process alone owns the block.
+                self.shm = SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, image: np.ndarray) -> Tuple[int, ...]:
+        if image.nbytes > self.slot_bytes:
+            raise ValueError(
+                f"{image.shape} image is larger than a {self.slot_bytes} byte slot; raise AI_SHM_SLOT_MB"
+            )
+        self.view(slot, image.shape)[...] = image
+        return image.shape
+
+    def close(self, unlink: bool = False) -> None:
+        try:
+            self.shm.close()
+        except BufferError:
+            # A numpy view is still alive; the mapping goes away with the process.
+            pass
+        if unlink:
+            self.shm.unlink()
+
+
+def _handlers() -> Dict[str, Callable[..., Any]]:
+    from app.tools import face_validation
+    from app.tools.id_detector import detect_batch
+
+    return {
+        "card": lambda frame: detect_batch([frame])[0],
+        "faces": face_validation.detect_live_faces,
+        "embed": face_validation.embed_live_face,
+        "card_face": face_validation.extract_card_face,
+        "card_embedding": face_validation.card_face_embedding,
+    }
+
+
+def _next_batch(requests: mp.Queue, max_batch: int, parent: int) -> Optional[List[Request]]:
+    while True:
+        try:
+            item = requests.get(timeout=PARENT_CHECK_SEC)
+            break
+        except queue.Empty:
+            if os.getppid() != parent:
+                return None
+    if item is None:
+        return None
+    batch = [item]
+    while len(batch) < max_batch:
+        try:
+            item = requests.get_nowait()
+        except queue.Empty:
+            break
+        if item is None:
+            requests.put(None)
+            break
+        batch.append(item)
+    return batch
+
+
+def _serve(
+    kind: str,
+    ring_name: str,
+    slots: int,
+    slot_bytes: int,
+    requests: mp.Queue,
+    replies: Connection,
+    parent: int,
+) -> None:
+    global _in_server
+    _in_server = True
+    # Shutdown comes from the API worker through the queue, not from Ctrl-C.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from app.model_registry import registry
+    from app.tools.id_detector import CARD_BATCH_MAX_SIZE, detect_batch
+
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+    handlers = _handlers()
+    models = KIND_MODELS[kind]
+    registry.load_all(models)
+    replies.send((None, True, registry.status(models)))
+    max_batch = max(1, CARD_BATCH_MAX_SIZE) if kind == KIND_CARD else 1
+
+    while True:
+        batch = _next_batch(requests, max_batch, parent)
+        if batch is None:
+            break
+        ladder.level = batch[-1][4]
+        if kind == KIND_CARD:
+            try:
+                results = detect_batch([ring.view(slot, shape) for _, _, slot, shape, _, _ in batch])
+            except Exception as exc:
+                for request_id, *_ in batch:
+                    replies.send((request_id, False, f"{type(exc).__name__}: {exc}"))
+                continue
+            for (request_id, *_), result in zip(batch, results):
+                replies.send((request_id, True, result))
+            continue
+
+        for request_id, method, slot, shape, _, args in batch:
+            try:
+                result = handlers[method](ring.view(slot, shape), *args)
+                if method in IMAGE_METHODS and result[0] is not None:
+                    # The crop may be a view of the input slot: copy before overwriting it.
+                    result = (ring.write(slot, np.ascontiguousarray(result[0]).copy()), *result[1:])
+                replies.send((request_id, True, result))
+            except Exception as exc:
+                replies.send((request_id, False, f"{type(exc).__name__}: {exc}"))
+    ring.close()
+
+
+class InferenceUnavailable(RuntimeError):
+    """No inference process could answer: not ready yet, restarting, or timed out."""
+
+
+@dataclass
+class _Worker:
+    kind: str
+    index: int
+    process: Any
+    requests: mp.Queue
+    replies: Connection
+    ready: bool = False
+    inflight: int = 0
+
+
+@dataclass
+class _Request:
+    future: Future
+    slot: int
+    worker: _Worker
+    abandoned: bool = False
+
+
+class InferenceClient:
+    """API-worker side of the inference server: owns the ring, the queues and the processes.
+
+    Each model process has its own request queue and reply pipe, so the
+    client knows which process holds which slot. `call` blocks the calling
+    executor thread until the reply arrives; a dispatcher thread routes
+    replies to waiting calls by request id. When every slot is in use,
+    callers wait for one, which bounds the frames in flight to AI_SHM_SLOTS.
+
+    A process that exits closes its pipe: the dispatcher fails its pending
+    calls at once, returns their slots and starts a replacement. A process
+    that does not answer within the timeout is terminated the same way; its
+    slot stays out of the ring until the process is gone, because the
+    process may still be reading or writing it.
+    """
+
+    def __init__(
+        self,
+        card_processes: int,
+        face_processes: int,
+        slots: int,
+        slot_bytes: int,
+        timeout: float = INFERENCE_TIMEOUT_SEC,
+        target: Callable[..., None] = _serve,
+    ) -> None:
+        self._context = mp.get_context("spawn")
+        self._target = target
+        self.timeout = timeout
+        self.ring = FrameRing(slots, slot_bytes)
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._inflight: Dict[int, _Request] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+        self._models: Dict[str, Dict[str, Any]] = {
+            name: {"state": "pending", "load_seconds": None, "error": None}
+            for models in KIND_MODELS.values()
+            for name in models
+        }
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        counts = {KIND_CARD: max(1, card_processes), KIND_FACE: max(1, face_processes)}
+        self._workers = [self._start_worker(kind, index) for kind, count in counts.items() for index in range(count)]
+        self._dispatcher = threading.Thread(target=self._dispatch, name="inference-dispatch", daemon=True)
+        self._dispatcher.start()
+        print(
+            f"[inference_server] Started {counts[KIND_CARD]} card and {counts[KIND_FACE]} face processes, "
+            f"{slots} x {slot_bytes / (1024 * 1024):.1f} MB frame slots"
+        )
+
+    def _start_worker(self, kind: str, index: int) -> _Worker:
+        requests = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=self._target,
+            args=(kind, self.ring.name, self.ring.slots, self.ring.slot_bytes, requests, writer, os.getpid()),
+            name=f"inference-{kind}-{index}",
+            daemon=True,
+        )
+        process.start()
+        # Only the child may hold the write end, so its exit shows up as EOF.
+        writer.close()
+        return _Worker(kind=kind, index=index, process=process, requests=requests, replies=reader)
+
+    def _dispatch(self) -> None:
+        while not self._closed:
+            with self._lock:
+                workers = {worker.replies: worker for worker in self._workers}
+            for conn in connection.wait([*workers, self._wakeup_reader]):
+                if conn is self._wakeup_reader:
+                    conn.recv()
+                    continue
+                worker = workers[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._replace(worker)
+                    continue
+                self._handle(worker, message)
+
+    def _handle(self, worker: _Worker, message: tuple) -> None:
+        request_id, ok, result = message
+        if request_id is None:
+            self._models.update(result)
+            worker.ready = True
+            return
+        with self._lock:
+            request = self._inflight.pop(request_id, None)
+            if request is None:
+                return
+            worker.inflight -= 1
+            if request.abandoned:
+                # Late reply: the process is done with the slot now.
+                self._free.put(request.slot)
+                return
+        if ok:
+            request.future.set_result(result)
+        else:
+            request.future.set_exception(RuntimeError(result))
+
+    def _replace(self, worker: _Worker) -> None:
+        process = worker.process
+        process.join()
+        mark_process_dead(process.pid)
+        worker.replies.close()
+        worker.requests.cancel_join_thread()
+        worker.requests.close()
+        failed = []
+        with self._lock:
+            for request_id, request in list(self._inflight.items()):
+                if request.worker is not worker:
+                    continue
+                del self._inflight[request_id]
+                if request.abandoned:
+                    self._free.put(request.slot)
+                else:
+                    failed.append(request.future)
+            if not self._closed:
+                print(f"[inference_server] {process.name} exited with code {process.exitcode}, restarting")
+                self._workers[self._workers.index(worker)] = self._start_worker(worker.kind, worker.index)
+        for future in failed:
+            future.set_exception(InferenceUnavailable(f"{process.name} exited"))
+
+    def _pick(self, kind: str) -> _Worker:
+        ready = [worker for worker in self._workers if worker.kind == kind and worker.ready]
+        if not ready:
+            raise InferenceUnavailable(f"No {kind} inference process is ready")
+        return min(ready, key=lambda worker: worker.inflight)
+
+    def call(self, method: str, image: np.ndarray, *args: Any) -> Any:
+        with span("inference_server"):
+            return self._call(method, image, *args)
+
+    def _call(self, method: str, image: np.ndarray, *args: Any) -> Any:
+        kind = METHOD_KINDS[method]
+        if not any(worker.kind == kind and worker.ready for worker in self._workers):
+            raise InferenceUnavailable(f"No {kind} inference process is ready")
+        try:
+            slot = self._free.get(timeout=self.timeout)
+        except queue.Empty:
+            raise InferenceUnavailable("No free shared-memory frame slot") from None
+        release = True
+        try:
+            shape = self.ring.write(slot, image)
+            future: Future = Future()
+            request_id = next(self._ids)
+            with self._lock:
+                worker = self._pick(kind)
+                self._inflight[request_id] = _Request(future=future, slot=slot, worker=worker)
+                worker.inflight += 1
+            worker.requests.put((request_id, method, slot, shape, ladder.level, args))
+            try:
+                result = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                with self._lock:
+                    request = self._inflight.get(request_id)
+                    if request is not None:
+                        # The process may still use the slot: the reader returns it on a late
+                        # reply, or once the terminated process has been reaped.
+                        request.abandoned = True
+                        release = False
+                if release:
+                    # The reply arrived while we were giving up on it.
+                    result = future.result()
+                else:
+                    print(f"[inference_server] {worker.process.name} did not answer {method}, terminating it")
+                    worker.ready = False
+                    worker.process.terminate()
+                    raise InferenceUnavailable(f"{method} timed out after {self.timeout}s") from None
+            if method in IMAGE_METHODS and result[0] is not None:
+                result = (self.ring.view(slot, result[0]).copy(), *result[1:])
+            return result
+        finally:
+            if release:
+                self._free.put(slot)
+
+    def is_ready(self) -> bool:
+        return all(worker.ready and worker.process.is_alive() for worker in self._workers) and all(
+            entry["state"] == "warm" for entry in self._models.values()
+        )
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._models)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.requests.put(None)
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            mark_process_dead(worker.process.pid)
+        self._wakeup_writer.send(None)
+        self._dispatcher.join(timeout=5)
+        self.ring.close(unlink=True)
+
+
+@lru_cache(maxsize=1)
+def get_inference_client() -> InferenceClient:
+    return InferenceClient(CARD_PROCESSES, FACE_PROCESSES, SHM_SLOTS, int(SHM_SLOT_MB * 1024 * 1024))
+
+
+def remote_client() -> Optional[InferenceClient]:
+    """The inference server to forward model calls to, or None to run them in this process."""
+    if not INFERENCE_SERVER or _in_server:
+        return None
+    return get_inference_client()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Optional, Tuple, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.metrics import ws_frames_dropped_total, ws_messages_by_type
+
+
+class FrameIngest:
+    """Per-session mailbox that keeps only the newest undecoded frame.
+
+    The receive loop keeps draining the socket while inference is busy; any
+    frame still waiting when a newer one arrives is dropped before it is
+    decoded. Control messages are never dropped and are served first.
+    """
+
+    def __init__(self) -> None:
+        self._frame: Optional[bytes] = None
+        self._controls: deque[str] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def push_frame(self, frame_bytes: bytes) -> None:
+        if self._frame is not None:
+            ws_frames_dropped_total.inc()
+        self._frame = frame_bytes
+        self._ready.set()
+
+    def push_control(self, text: str) -> None:
+        self._controls.append(text)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next(self) -> Optional[Tuple[str, Union[str, bytes]]]:
+        while True:
+            if self._controls:
+                return "control", self._controls.popleft()
+            if self._frame is not None:
+                frame_bytes = self._frame
+                self._frame = None
+                return "frame", frame_bytes
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+
+async def receive_into(websocket: WebSocket, ingest: FrameIngest) -> None:
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if "text" in message and message["text"]:
+                ws_messages_by_type["control"].inc()
+                ingest.push_control(message["text"].strip().lower())
+                continue
+            frame_bytes = message.get("bytes")
+            if not frame_bytes:
+                continue
+            ws_messages_by_type["frame"].inc()
+            ingest.push_frame(frame_bytes)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        ingest.close()
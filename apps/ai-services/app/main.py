@@ -1,16 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST
 import uvicorn
 
 from app.routers import health
 from app.routers import id_verification
 from app.routers import food_validation
+from app.inference_server import INFERENCE_SERVER, get_inference_client
+from app.metrics import render_latest
+from app.model_registry import MODEL_PRELOAD, registry
+from app.worker import start_metrics_refresh, update_worker_metrics
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    start_metrics_refresh()
+    if INFERENCE_SERVER:
+        get_inference_client()
+    elif MODEL_PRELOAD == "background":
+        registry.start_background_loading()
+    yield
+    if INFERENCE_SERVER:
+        get_inference_client().shutdown()
+
 
 app = FastAPI(
     title="Eatable AI Service",
     description="Identity verification, food validation, and computer vision services",
     version="1.2.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -38,7 +58,8 @@ app.include_router(food_validation.router)
 
 @app.get("/metrics")
 def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    update_worker_metrics()
+    return Response(render_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
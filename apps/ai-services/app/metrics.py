@@ -1,6 +1,61 @@
-from prometheus_client import Counter, Gauge, Histogram
+"""Prometheus metrics.
 
-ws_active_connections = Gauge(
+With PROMETHEUS_MULTIPROC_DIR set (`python -m app.serve --workers N` sets it),
+every process writes its samples to files in that directory and `/metrics`
+merges them, so a scrape sees all workers instead of the one that answered.
+Each gauge declares how its per-process values are merged. The `*_by_*`
+dicts hold pre-bound label children for per-frame call sites, skipping the
+lock and label validation of `.labels()`.
+"""
+import os
+from typing import Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+
+def _bind(metric, *values: str) -> Dict[str, object]:
+    return {value: metric.labels(value) for value in values}
+
+
+def multiprocess_registry() -> CollectorRegistry:
+    """A registry that reads the merged samples of every process in PROMETHEUS_MULTIPROC_DIR."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest() -> bytes:
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest()
+    return generate_latest(multiprocess_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live-gauge samples of an exited worker or inference process."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+class FleetGauge:
+    """A load gauge exported twice: `name` sums the live workers, `name_per_worker`
+    keeps each worker's own value (labelled by pid in multiprocess mode)."""
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.total = Gauge(name, documentation, multiprocess_mode="livesum")
+        self.per_worker = Gauge(f"{name}_per_worker", f"{documentation}, per worker", multiprocess_mode="liveall")
+
+    def inc(self) -> None:
+        self.total.inc()
+        self.per_worker.inc()
+
+    def dec(self) -> None:
+        self.total.dec()
+        self.per_worker.dec()
+
+
+ws_active_connections = FleetGauge(
     "ai_ws_active_connections",
     "Active ID verification websocket connections",
 )
@@ -10,6 +65,7 @@ ws_messages_total = Counter(
     "Websocket messages received",
     ["type"],
 )
+ws_messages_by_type = _bind(ws_messages_total, "frame", "control")
 
 id_frames_total = Counter(
     "ai_id_frames_total",
@@ -37,3 +93,126 @@ frame_processing_seconds = Histogram(
     "Frame processing duration",
     ["stage"],
 )
+frame_processing_by_stage = _bind(frame_processing_seconds, "id", "face")
+
+PIPELINE_STAGES = (
+    "decode",
+    "resize",
+    "card_track",
+    "card_batch",
+    "card_inference",
+    "card_postprocess",
+    "face_detect",
+    "face_embed",
+    "card_face_rotations",
+    "card_face_embed",
+    "encode_image",
+    "inference_server",
+    "reply_encode",
+    "send",
+)
+
+pipeline_stage_seconds = Histogram(
+    "ai_pipeline_stage_seconds",
+    "Time spent in each step of the verification pipeline",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+pipeline_stage_by_name = _bind(pipeline_stage_seconds, *PIPELINE_STAGES)
+
+inference_queue_depth = FleetGauge(
+    "ai_inference_queue_depth",
+    "Inference jobs waiting for an executor thread",
+)
+
+inference_queue_wait_seconds = Histogram(
+    "ai_inference_queue_wait_seconds",
+    "Time inference jobs wait before an executor thread picks them up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+ws_frames_dropped_total = Counter(
+    "ai_ws_frames_dropped_total",
+    "Websocket frames superseded by a newer frame before decoding",
+)
+
+inference_batch_size = Histogram(
+    "ai_inference_batch_size",
+    "Frames per batched model call",
+    ["model"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32),
+)
+
+inference_batch_wait_seconds = Histogram(
+    "ai_inference_batch_wait_seconds",
+    "Time frames wait in the micro-batching queue before their batch runs",
+    ["model"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+card_face_speculative_total = Counter(
+    "ai_card_face_speculative_total",
+    "Locks that reused a speculative card-face extraction (hit) or started a new one (miss)",
+    ["result"],
+)
+
+face_live_detections_total = Counter(
+    "ai_face_live_detections_total",
+    "Live face detections by search mode (tracked region, region miss, full frame)",
+    ["mode"],
+)
+face_live_detections_by_mode = _bind(face_live_detections_total, "roi", "roi_miss", "full")
+
+card_tracker_frames_total = Counter(
+    "ai_card_tracker_frames_total",
+    "Card frames answered by optical-flow tracking (tracked) or sent to the model (detect, lost)",
+    ["result"],
+)
+card_tracker_frames_by_result = _bind(card_tracker_frames_total, "tracked", "detect", "lost")
+
+frame_gate_total = Counter(
+    "ai_frame_gate_total",
+    "Frames skipped as byte duplicates or visually unchanged, or processed by the models",
+    ["result"],
+)
+frame_gate_by_result = _bind(frame_gate_total, "duplicate", "unchanged", "processed")
+
+resolution_scale = Gauge(
+    "ai_resolution_scale",
+    "Current scale applied to per-frame model input sizes by the load-aware ladder",
+    multiprocess_mode="liveall",
+)
+
+ws_response_bytes_total = Counter(
+    "ai_ws_response_bytes_total",
+    "Bytes of websocket replies sent, by negotiated encoding",
+    ["encoding"],
+)
+ws_response_bytes_by_encoding = _bind(ws_response_bytes_total, "json", "msgpack")
+
+worker_memory_bytes = Gauge(
+    "ai_worker_memory_bytes",
+    "Memory of this worker process: rss, pss (shared pages split across workers) and shared",
+    ["kind"],
+    multiprocess_mode="liveall",
+)
+
+face_rotation_attempts = Histogram(
+    "ai_face_rotation_attempts",
+    "Card rotations scored per card-face extraction",
+    buckets=(1, 2, 3, 4, 5, 6, 7, 8),
+)
+
+model_ready = Gauge(
+    "ai_model_ready",
+    "Whether a model is loaded and warmed up (1) or not (0)",
+    ["model"],
+    multiprocess_mode="livemax",
+)
+
+model_load_seconds = Gauge(
+    "ai_model_load_seconds",
+    "Time taken to load and warm up a model",
+    ["model"],
+    multiprocess_mode="livemax",
+)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.metrics import model_load_seconds, model_ready
+
+MODEL_PRELOAD = os.getenv("AI_MODEL_PRELOAD", "background").strip().lower()
+MODEL_RETRY_SEC = float(os.getenv("AI_MODEL_RETRY_SEC", "30"))
+MODEL_RETRY_MAX_SEC = float(os.getenv("AI_MODEL_RETRY_MAX_SEC", "600"))
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_LOADED = "loaded"
+STATE_WARM = "warm"
+STATE_FAILED = "failed"
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    loader: Callable[[], Any]
+    warmup: Optional[Callable[[Any], None]] = None
+    fork_safe: bool = True
+    state: str = STATE_PENDING
+    load_seconds: Optional[float] = None
+    error: Optional[str] = None
+    failures: int = 0
+    retry_at: float = 0.0
+    value: Any = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+    """Loads models on first use (or in a startup thread) and tracks their readiness.
+
+    A weight file that fails to load marks only that model as failed, so the
+    rest of the service keeps running and `/api/ready` reports the problem.
+    The next `get()` after a backoff (doubling from AI_MODEL_RETRY_SEC up to
+    AI_MODEL_RETRY_MAX_SEC) tries the load again.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, ModelEntry] = {}
+        self._background: Optional[threading.Thread] = None
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        fork_safe: bool = True,
+    ) -> None:
+        """`fork_safe=False` marks models whose runtime starts threads on load
+        (onnxruntime sessions); the multi-worker launcher loads those in each
+        worker instead of in the parent."""
+        if name not in self._entries:
+            self._entries[name] = ModelEntry(name=name, loader=loader, warmup=warmup, fork_safe=fork_safe)
+            model_ready.labels(name).set(0)
+
+    def get(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.state == STATE_WARM:
+            return entry.value
+        self._load(entry)
+        if entry.state == STATE_FAILED:
+            raise RuntimeError(f"{name} model failed to load: {entry.error}")
+        return entry.value
+
+    def _load(self, entry: ModelEntry, warm: bool = True) -> None:
+        with entry.lock:
+            if entry.state == STATE_WARM:
+                return
+            if entry.state == STATE_FAILED and time.monotonic() < entry.retry_at:
+                return
+            if entry.state == STATE_LOADED and not warm:
+                return
+            preloaded = entry.state == STATE_LOADED
+            entry.state = STATE_LOADING
+            start = time.perf_counter()
+            try:
+                value = entry.value if preloaded else entry.loader()
+                if not warm:
+                    entry.value = value
+                    entry.load_seconds = time.perf_counter() - start
+                    entry.state = STATE_LOADED
+                    return
+                if entry.warmup is not None:
+                    entry.warmup(value)
+            except Exception as exc:
+                entry.state = STATE_FAILED
+                entry.error = str(exc)
+                entry.value = None
+                entry.failures += 1
+                backoff = min(MODEL_RETRY_SEC * 2 ** (entry.failures - 1), MODEL_RETRY_MAX_SEC)
+                entry.retry_at = time.monotonic() + backoff
+                print(f"[model_registry] Failed to load {entry.name} (retry in {backoff:.0f}s): {exc}")
+                return
+            entry.value = value
+            entry.error = None
+            entry.failures = 0
+            entry.load_seconds = (entry.load_seconds if preloaded else 0.0) + time.perf_counter() - start
+            entry.state = STATE_WARM
+            model_ready.labels(entry.name).set(1)
+            model_load_seconds.labels(entry.name).set(entry.load_seconds)
+
+    def load_all(self, names: Optional[Iterable[str]] = None) -> None:
+        for entry in self._select(names):
+            self._load(entry)
+
+    def preload_for_fork(self) -> None:
+        """Load fork-safe weights without running them, so forked workers share the pages."""
+        for entry in list(self._entries.values()):
+            if entry.fork_safe:
+                self._load(entry, warm=False)
+
+    def start_background_loading(self) -> None:
+        if self._background is not None:
+            return
+        self._background = threading.Thread(
+            target=self.load_all,
+            name="model-preload",
+            daemon=True,
+        )
+        self._background.start()
+
+    def is_ready(self) -> bool:
+        return all(entry.state == STATE_WARM for entry in self._entries.values())
+
+    def status(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        return {
+            entry.name: {
+                "state": entry.state,
+                "load_seconds": round(entry.load_seconds, 3) if entry.load_seconds is not None else None,
+                "error": entry.error,
+            }
+            for entry in self._select(names)
+        }
+
+    def _select(self, names: Optional[Iterable[str]]) -> list[ModelEntry]:
+        if names is None:
+            return list(self._entries.values())
+        return [self._entries[name] for name in names]
+
+
+registry = ModelRegistry()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from app.metrics import resolution_scale
+
+AI_RESOLUTION_ADAPTIVE = os.getenv("AI_RESOLUTION_ADAPTIVE", "off").strip().lower() == "on"
+AI_FRAME_LATENCY_SLO_MS = float(os.getenv("AI_FRAME_LATENCY_SLO_MS", "150"))
+RESOLUTION_STEPS = (1.0, 0.75, 0.5)
+LATENCY_WINDOW = 100
+RECOVER_RATIO = 0.6
+
+
+class ResolutionLadder:
+    """Scales per-frame model input sizes down while this worker is over its latency SLO.
+
+    Every LATENCY_WINDOW frames the p95 of recent frame latencies is checked:
+    above the SLO the next smaller step is used, below RECOVER_RATIO of it
+    the next larger one. The window restarts after each change.
+    """
+
+    def __init__(self, adaptive: bool, slo_seconds: float) -> None:
+        self.adaptive = adaptive
+        self.slo_seconds = slo_seconds
+        self.level = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        resolution_scale.set(RESOLUTION_STEPS[0])
+
+    def observe(self, seconds: float) -> None:
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) < LATENCY_WINDOW:
+                return
+            p95 = float(np.percentile(self._latencies, 95))
+            level = self.level
+            if p95 > self.slo_seconds and level < len(RESOLUTION_STEPS) - 1:
+                level += 1
+            elif p95 < self.slo_seconds * RECOVER_RATIO and level > 0:
+                level -= 1
+            self._latencies.clear()
+            if level != self.level:
+                self.level = level
+                resolution_scale.set(RESOLUTION_STEPS[level])
+                print(f"[resolution] p95 {p95 * 1000:.0f} ms, input scale {RESOLUTION_STEPS[level]}")
+
+    def size(self, base: int, multiple: int = 32) -> int:
+        """`base` scaled to the current step, rounded to a stride-friendly multiple."""
+        scaled = base * RESOLUTION_STEPS[self.level]
+        return max(multiple, int(round(scaled / multiple)) * multiple)
+
+
+ladder = ResolutionLadder(AI_RESOLUTION_ADAPTIVE, AI_FRAME_LATENCY_SLO_MS / 1000.0)
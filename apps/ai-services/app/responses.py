@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Union
+
+import msgpack
+
+from app.metrics import ws_response_bytes_by_encoding
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+ENCODINGS = [ENCODING_JSON, ENCODING_MSGPACK]
+CROP_FIELDS = ("crop", "face_crop")
+_MISSING = object()
+
+
+class ResponseEncoder:
+    """Per-session serializer for websocket replies.
+
+    Defaults to the original full JSON text messages. A `hello` control
+    message can switch to msgpack binary frames and/or delta mode, where a
+    frame reply only carries the fields that changed since the previous one
+    (removed fields are sent as null and an unchanged reply is `{}`). Clients
+    that also ask for `crop-once` get each crop once; later replies omit it.
+    """
+
+    def __init__(self) -> None:
+        self.encoding = ENCODING_JSON
+        self.delta = False
+        self.crop_once = False
+        self.reset()
+
+    def reset(self) -> None:
+        self._last: Dict[str, Any] = {}
+        self._sent_crops: set[bytes] = set()
+
+    def configure(self, options: Iterable[str]) -> None:
+        options = list(options)
+        self.crop_once = "crop-once" in options
+        for option in options:
+            if option in ENCODINGS:
+                self.encoding = option
+            elif option == "delta":
+                self.delta = True
+            elif option == "full":
+                self.delta = False
+        self._last = {}
+
+    def hello(self, **extra: Any) -> str:
+        # Always plain JSON so a client can read it before switching.
+        return json.dumps(
+            {
+                "type": "HELLO",
+                "encodings": ENCODINGS,
+                "encoding": self.encoding,
+                "delta": self.delta,
+                "crop_once": self.crop_once,
+                **extra,
+            }
+        )
+
+    def encode(self, message: Dict[str, Any], frame_reply: bool = True) -> Union[str, bytes]:
+        if self.crop_once:
+            message = self._drop_sent_crops(message)
+        if frame_reply and self.delta:
+            message, self._last = self._diff(message), message
+        if self.encoding == ENCODING_MSGPACK:
+            data = msgpack.packb(message, use_bin_type=True)
+        else:
+            data = json.dumps(message)
+        ws_response_bytes_by_encoding[self.encoding].inc(len(data))
+        return data
+
+    def _drop_sent_crops(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        message = dict(message)
+        for field in CROP_FIELDS:
+            crop = message.get(field)
+            if not crop:
+                continue
+            digest = hashlib.blake2b(crop.encode(), digest_size=16).digest()
+            if digest in self._sent_crops:
+                del message[field]
+            else:
+                self._sent_crops.add(digest)
+        return message
+
+    def _diff(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        delta = {key: value for key, value in message.items() if self._last.get(key, _MISSING) != value}
+        for key in self._last:
+            # Crops are one-shot: their absence later does not clear them on the client.
+            if key not in message and key not in CROP_FIELDS:
+                delta[key] = None
+        return delta
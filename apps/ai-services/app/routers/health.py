@@ -1,4 +1,9 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.inference_server import remote_client
+from app.model_registry import registry
+from app.worker import all_workers, worker_info
 
 router = APIRouter(prefix="/api", tags=["health"])
 
@@ -9,3 +14,22 @@ def health_check():
         "status": "healthy",
         "service": "ai-validation",
     }
+
+
+@router.get("/ready")
+def readiness_check():
+    # In inference-server mode the models live in the inference processes.
+    models = remote_client() or registry
+    ready = models.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "models": models.status(),
+        },
+    )
+
+
+@router.get("/worker")
+def worker_status():
+    return {**worker_info(), "workers": all_workers()}
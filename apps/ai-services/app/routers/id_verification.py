@@ -1,20 +1,30 @@
-import json
+import asyncio
+import dataclasses
 import time
+from typing import Optional
+
 from fastapi import APIRouter, File, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
-import cv2
-import numpy as np
 
 from app.metrics import (
     face_validation_total,
-    frame_processing_seconds,
+    frame_processing_by_stage,
     id_frames_total,
     id_lock_events_total,
     id_valid_detections_total,
     ws_active_connections,
-    ws_messages_total,
 )
-from app.state import VerificationState
+from app.decode import FRAME_FORMATS, decode_frame
+from app.gating import FrameGate
+from app.inference import run_inference
+from app.inference_server import InferenceUnavailable
+from app.resolution import ladder
+from app.responses import ResponseEncoder
+from app.timing import breakdown_ms, leave_frame, span, start_frame
+from app.ingest import FrameIngest, receive_into
+from app.state import VerificationPayload, VerificationState
+from app.tools import face_validation, id_detector
 from app.tools.id_detector import process_frame
+from app.worker import session_closed, session_opened
 
 router = APIRouter(prefix="/id", tags=["id-verification"])
 
@@ -38,66 +48,178 @@ async def id_verification_ws(websocket: WebSocket):
     await websocket.accept()
     state = VerificationState()
     ws_active_connections.inc()
+    session_opened()
     face_match_reported = False
+    ingest = FrameIngest()
+    gate = FrameGate()
+    receiver = asyncio.create_task(receive_into(websocket, ingest))
+    encoder = ResponseEncoder()
+    send_lock = asyncio.Lock()
+    face_tasks: set[asyncio.Task] = set()
+    report_timings = False
+    timings: dict[str, float] = {}
+
+    async def send(message: dict, frame_reply: bool = True) -> None:
+        async with send_lock:
+            with span("reply_encode"):
+                data = encoder.encode(message, frame_reply)
+            with span("send"):
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
 
     try:
         while True:
-            message = await websocket.receive()
-            if message.get("type") == "websocket.disconnect":
+            item = await ingest.next()
+            if item is None:
                 break
-            if "text" in message and message["text"]:
-                ws_messages_total.labels("control").inc()
-                text = message["text"].strip().lower()
-                if text == "reset":
+            kind, data = item
+            if kind == "control":
+                if data == "reset":
                     state.reset()
-                elif text == "retry_face":
+                    gate.reset()
+                    encoder.reset()
+                elif data == "retry_face":
                     state.reset_face_validation()
+                    gate.reset()
+                elif data.split()[:1] == ["hello"]:
+                    options = data.split()[1:]
+                    report_timings = "timing" in options
+                    async with send_lock:
+                        encoder.configure(options)
+                        await websocket.send_text(
+                            encoder.hello(frame_formats=FRAME_FORMATS, timing=report_timings)
+                        )
                 continue
 
-            frame_bytes = message.get("bytes")
-            if not frame_bytes:
-                continue
-            ws_messages_total.labels("frame").inc()
-
-            frame = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
-            if frame is None:
+            # The previous reply's encode and send finish after it went out: report them now.
+            previous_reply = {stage: timings[stage] for stage in ("reply_encode", "send") if stage in timings}
+            timings = start_frame()
+            start_time = time.perf_counter()
+            try:
+                result = await run_inference(_process_frame_bytes, state, gate, data)
+            except InferenceUnavailable as e:
+                # Still answer the frame so the client sends the next one.
+                print(f"[id_verification] Inference unavailable: {e}")
+                await send({"type": "ERROR", "error": "inference_unavailable"}, frame_reply=False)
                 continue
-
-            if state.state == "LOCKED" and state.face_validation_done and state.face_payload:
-                await websocket.send_text(json.dumps(_payload_to_dict(state.face_payload)))
+            if result is None:
                 continue
+            stage, prev_state, payload = result
 
-            if state.state == "LOCKED" and state.locked_payload:
-                start_time = time.perf_counter()
-                payload = state.update_face(frame)
-                frame_processing_seconds.labels("face").observe(time.perf_counter() - start_time)
+            if stage == "face":
                 if payload.validation_done and payload.matched and not face_match_reported:
                     face_validation_total.labels("matched").inc()
                     face_match_reported = True
                 if payload.validation_failed:
                     face_validation_total.labels("failed").inc()
-                if payload.validation_done:
-                    state.face_payload = payload
-                await websocket.send_text(json.dumps(_payload_to_dict(payload)))
-                continue
-
-            start_time = time.perf_counter()
-            detection, resized_frame = process_frame(frame)
-            frame_processing_seconds.labels("id").observe(time.perf_counter() - start_time)
-            id_frames_total.inc()
-            if detection.valid_boxes:
-                id_valid_detections_total.inc()
-            prev_state = state.state
-            payload = state.update(detection, resized_frame)
-            if prev_state != "LOCKED" and payload.state == "LOCKED":
+            elif stage == "id" and prev_state != "LOCKED" and payload.state == "LOCKED":
                 id_lock_events_total.inc()
-            await websocket.send_text(json.dumps(_payload_to_dict(payload)))
+            message = _payload_to_dict(payload)
+            if report_timings:
+                message["timings"] = {
+                    **breakdown_ms(timings),
+                    "total": round((time.perf_counter() - start_time) * 1000.0, 2),
+                    "previous_reply": breakdown_ms(previous_reply),
+                }
+            await send(message)
+
+            if stage == "id" and payload.face_pending and state.card_face_future is not None:
+                task = asyncio.create_task(
+                    _send_card_face_ready(send, state, payload, state.card_face_future)
+                )
+                face_tasks.add(task)
+                task.add_done_callback(face_tasks.discard)
     except WebSocketDisconnect:
         return
     except RuntimeError:
         return
     finally:
+        receiver.cancel()
+        for task in list(face_tasks):
+            task.cancel()
         ws_active_connections.dec()
+        session_closed()
+
+
+async def _send_card_face_ready(send, state: VerificationState, locked_payload: VerificationPayload, future) -> None:
+    # This task started with a copy of the locking frame's context; its reply is not part of that frame.
+    leave_frame()
+    try:
+        result = await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[id_verification] Card face extraction failed: {e}")
+        result = None
+    # A reset or a newer lock makes this result stale.
+    if state.locked_payload is not locked_payload:
+        return
+    face_crop = result.encoded_face_crop if result is not None else ""
+    message = {
+        "type": "CARD_FACE_READY",
+        "face_detected": bool(face_crop),
+        "face_bbox": result.normalized_face_bbox if result is not None else None,
+    }
+    if face_crop:
+        message["face_crop"] = face_crop
+    try:
+        await send(message, frame_reply=False)
+    except (WebSocketDisconnect, RuntimeError):
+        return
+
+
+def _process_frame_bytes(
+    state: VerificationState, gate: FrameGate, frame_bytes: bytes
+) -> Optional[tuple[str, str, VerificationPayload]]:
+    # Runs on the inference executor: decoding and model calls must not block the event loop.
+    prev_state = state.state
+    if state.state == "LOCKED" and state.face_validation_done and state.face_payload:
+        return "cached", prev_state, state.face_payload
+
+    stage = "face" if state.state == "LOCKED" and state.locked_payload else "id"
+    if gate.is_duplicate(frame_bytes, stage):
+        frame = gate.frame
+        skip = True
+    else:
+        max_width = face_validation.MAX_FRAME_WIDTH if stage == "face" else id_detector.MAX_FRAME_WIDTH
+        with span("decode"):
+            frame = decode_frame(frame_bytes, max_width)
+        if frame is None:
+            return None
+        skip = gate.is_unchanged(frame, stage)
+
+    if stage == "face":
+        if skip:
+            # The verdict and similarity belong to the processed frame; do not repeat them as new.
+            reused = dataclasses.replace(gate.result, validation_failed=False, face_similarity=None)
+            return "skipped", prev_state, reused
+        start_time = time.perf_counter()
+        payload = state.update_face(frame)
+        elapsed = time.perf_counter() - start_time
+        frame_processing_by_stage["face"].observe(elapsed)
+        ladder.observe(elapsed)
+        if payload.validation_done:
+            state.face_payload = payload
+        gate.processed(frame, stage, payload)
+        return "face", prev_state, payload
+
+    if skip:
+        # Nothing moved: feed the last detection back so lock timing still advances.
+        detection, resized_frame = gate.result
+    else:
+        start_time = time.perf_counter()
+        detection, resized_frame = process_frame(frame, state.card_tracker)
+        elapsed = time.perf_counter() - start_time
+        frame_processing_by_stage["id"].observe(elapsed)
+        ladder.observe(elapsed)
+        id_frames_total.inc()
+        if detection.valid_boxes:
+            id_valid_detections_total.inc()
+        gate.processed(frame, stage, (detection, resized_frame))
+    payload = state.update(detection, resized_frame)
+    return "id", prev_state, payload
 
 
 def _payload_to_dict(payload):
@@ -126,4 +248,6 @@ def _payload_to_dict(payload):
         response["face_similarity"] = payload.face_similarity
     if payload.best_similarity is not None:
         response["best_similarity"] = payload.best_similarity
+    if payload.face_pending:
+        response["face_pending"] = True
     return response
@@ -0,0 +1,159 @@
+"""Multi-worker launcher: load model weights once, then fork uvicorn workers.
+
+The parent binds the listening socket, loads every fork-safe model (torch
+weights) without running it, freezes the GC so refcount updates do not
+un-share those pages, and forks AI_WORKERS children that serve the same
+socket. Each child warms the shared models and loads the onnxruntime ones
+itself. A websocket is one connection, so an /id/ws session stays on the
+worker that accepted it. Dead workers are re-forked from the loaded parent.
+Metrics are collected in PROMETHEUS_MULTIPROC_DIR (a temporary directory
+unless set), so /metrics on any worker reports all of them.
+
+Usage:
+    python -m app.serve --workers 4 --port 8000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import uvicorn
+
+AI_WORKERS = int(os.getenv("AI_WORKERS", "1"))
+RESPAWN_DELAY_SEC = 1.0
+
+
+def _prepare_metrics_dir() -> None:
+    # Must run before prometheus_client is imported: it picks its value store then.
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="ai-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, workers: int, sock: socket.socket) -> None:
+    from app import worker
+    from app.main import app
+
+    worker.WORKER_ID = str(index)
+    os.environ["AI_WORKER_ID"] = worker.WORKER_ID
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if "OMP_NUM_THREADS" not in os.environ:
+        import torch
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on", log_level="info"))
+    server.run(sockets=[sock])
+
+
+def _spawn(index: int, workers: int, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(index, workers, sock)
+        except BaseException as exc:
+            print(f"[serve] Worker {index} crashed: {exc}")
+            code = 1
+        finally:
+            os._exit(code)
+    print(f"[serve] Worker {index} started (pid {pid})")
+    return pid
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    if workers <= 1:
+        from app.main import app
+
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    _prepare_metrics_dir()
+    from app.inference_server import INFERENCE_SERVER
+    from app.main import app  # noqa: F401  (registers every model)
+    from app.metrics import mark_process_dead
+    from app.model_registry import registry
+    from app.worker import memory_usage
+
+    sock = _bind(host, port)
+    start = time.perf_counter()
+    if not INFERENCE_SERVER:
+        # With the inference server each worker starts its own model processes instead.
+        registry.preload_for_fork()
+    gc.collect()
+    gc.freeze()
+    rss_mb = memory_usage().get("rss", 0) / (1024 * 1024)
+    print(f"[serve] Preloaded models in {time.perf_counter() - start:.1f}s, parent RSS {rss_mb:.0f} MB")
+    # The parent serves no requests: keep its not-ready model gauges out of the merge.
+    mark_process_dead(os.getpid())
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        children[_spawn(index, workers, sock)] = index
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        mark_process_dead(pid)
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        print(f"[serve] Worker {index} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(RESPAWN_DELAY_SEC)
+        children[_spawn(index, workers, sock)] = index
+    sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=AI_WORKERS)
+    args = parser.parse_args()
+    if args.workers > 1 and not hasattr(os, "fork"):
+        sys.exit("Multiple workers need os.fork (Linux/macOS)")
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
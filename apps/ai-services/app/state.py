@@ -1,28 +1,36 @@
 from __future__ import annotations
 
 import base64
+import os
 import time
 from collections import deque
-from dataclasses import dataclass
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
 from typing import Optional, Tuple
 
 import cv2
 import numpy as np
 
+from app.inference import submit_background, submit_speculative
+from app.metrics import card_face_speculative_total, face_live_detections_by_mode
+from app.timing import span
 from app.tools.face_validation import (
     FACE_MATCH_THRESHOLD,
-    LIVE_FACE_CONF_THRES,
+    FACE_TRACK_FULL_EVERY,
+    FACE_TRACKING,
     cosine_similarity,
-    crop_face_from_bbox,
-    detect_faces_yolo,
+    detect_live_faces,
+    embed_live_face,
+    card_face_embedding,
     extract_card_face,
-    get_best_face,
-    get_face_model,
-    get_insightface_app,
-    normalize_embedding,
+    live_face_roi,
     resize_frame,
 )
-from app.tools.id_detector import FrameDetection, MIN_AREA_RATIO
+from app.tools.detections import Detections
+from app.tools.id_detector import CardTracker, FrameDetection, MIN_AREA_RATIO
+
+CARD_FACE_SPECULATIVE = os.getenv("CARD_FACE_SPECULATIVE", "on").strip().lower() == "on"
+CARD_FACE_SPECULATIVE_IOU = float(os.getenv("CARD_FACE_SPECULATIVE_IOU", "0.85"))
 
 
 @dataclass
@@ -43,6 +51,67 @@ class VerificationPayload:
     validation_done: bool = False
     validation_failed: bool = False
     best_similarity: Optional[float] = None
+    face_pending: bool = False
+
+
+@dataclass
+class CardFaceResult:
+    face_crop: Optional[np.ndarray]
+    face_bbox: Optional[Tuple[int, int, int, int]]
+    normalized_face_bbox: Optional[Tuple[float, float, float, float]]
+    encoded_face_crop: str
+    embedding_future: Optional[Future]
+
+
+@dataclass
+class SpeculativeCardFace:
+    bbox: Tuple[int, int, int, int]
+    card_crop: np.ndarray
+    future: Future
+
+
+def _bbox_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _drop_card_face_future(future: Future) -> None:
+    # A running extraction cannot be cancelled; cancel the embedding it starts instead.
+    if not future.cancel():
+        future.add_done_callback(_cancel_result_embedding)
+
+
+def _cancel_result_embedding(future: Future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    embedding_future = future.result().embedding_future
+    if embedding_future is not None:
+        embedding_future.cancel()
+
+
+def _embed_when_taken(future: Future) -> Future:
+    """A speculative extraction as a lock-time one: start its embedding once it resolves."""
+    taken: Future = Future()
+    # Running, so dropping it goes through _cancel_result_embedding like a real job.
+    taken.set_running_or_notify_cancel()
+
+    def _resolve(source: Future) -> None:
+        if source.cancelled():
+            taken.set_exception(RuntimeError("speculative card face extraction was cancelled"))
+            return
+        if source.exception() is not None:
+            taken.set_exception(source.exception())
+            return
+        result = source.result()
+        if result.face_crop is not None:
+            result = replace(result, embedding_future=submit_background(card_face_embedding, result.face_crop))
+        taken.set_result(result)
+
+    future.add_done_callback(_resolve)
+    return taken
 
 
 class VerificationState:
@@ -67,21 +136,21 @@ class VerificationState:
         self.face_stillness_sec = face_stillness_sec
         self.face_stillness_pixels = face_stillness_pixels
         self.face_grace_sec = face_grace_sec
-        try:
-            get_face_model()
-            get_insightface_app()
-        except Exception:
-            pass
+        self.card_face_future: Optional[Future] = None
+        self.ref_embedding_future: Optional[Future] = None
+        self.speculative_card_face: Optional[SpeculativeCardFace] = None
+        self.card_tracker = CardTracker()
         self.reset()
 
     def update_face(self, frame: np.ndarray) -> VerificationPayload:
         if self.face_validation_done and self.face_payload is not None:
             return self.face_payload
 
-        frame = resize_frame(frame)
+        self._apply_card_face(wait=False)
+        with span("resize"):
+            frame = resize_frame(frame)
         height, width = frame.shape[:2]
-        face_model = get_face_model()
-        faces = detect_faces_yolo(frame, face_model, conf_threshold=LIVE_FACE_CONF_THRES)
+        faces = self._detect_live_faces(frame)
         face_detected = bool(faces)
 
         now = time.time()
@@ -98,7 +167,8 @@ class VerificationState:
         normalized_face_bbox: Optional[Tuple[float, float, float, float]] = None
 
         if faces:
-            best_face = max(faces, key=lambda f: (f["score"], f["area_ratio"]))
+            best_face = faces.best()
+            self.face_track_bbox = best_face["bbox"]
             confidence = float(best_face["score"])
             area_ratio = float(best_face["area_ratio"])
             x1, y1, x2, y2 = best_face["bbox"]
@@ -136,27 +206,15 @@ class VerificationState:
                 self.face_validation_best_similarity = None
                 best_similarity = None
 
+                self._apply_card_face(wait=True)
                 if self.ref_embedding is None and not self.ref_embedding_attempted and self.card_face_crop is not None:
                     self.ref_embedding_attempted = True
-                    app = get_insightface_app()
-                    ref_face = get_best_face(app, self.card_face_crop)
-                    if ref_face is not None:
-                        self.ref_embedding = normalize_embedding(ref_face.embedding)
+                    self.ref_embedding = self._wait_ref_embedding()
 
             if self.face_validation_window_start is not None:
                 if self.ref_embedding is not None:
-                    crop = crop_face_from_bbox(
-                        frame, np.array([x1, y1, x2, y2], dtype=np.float32), 0.15
-                    )
-                    if crop is None or crop.size == 0:
-                        crop = frame[
-                            max(0, int(y1)) : min(height, int(y2)),
-                            max(0, int(x1)) : min(width, int(x2)),
-                        ]
-                    app = get_insightface_app()
-                    face = get_best_face(app, crop) if crop is not None else None
-                    if face is not None:
-                        emb = normalize_embedding(face.embedding)
+                    emb = embed_live_face(frame, best_face)
+                    if emb is not None:
                         similarity = cosine_similarity(emb, self.ref_embedding)
                         if self.face_validation_best_similarity is None:
                             self.face_validation_best_similarity = similarity
@@ -181,6 +239,7 @@ class VerificationState:
                             self.face_validation_window_start = None
                             self.face_validation_best_similarity = None
         else:
+            self.face_track_bbox = None
             self.face_hits.clear()
             self.face_last_center = None
             self.face_still_start = None
@@ -211,8 +270,29 @@ class VerificationState:
             self.face_payload = payload
         return payload
 
+    def _detect_live_faces(self, frame: np.ndarray) -> Detections:
+        # Search around the last face and run a full-frame detection every
+        # FACE_TRACK_FULL_EVERY frames, or as soon as the region comes up empty.
+        if (
+            FACE_TRACKING
+            and self.face_track_bbox is not None
+            and self.face_frames_since_full < FACE_TRACK_FULL_EVERY
+        ):
+            height, width = frame.shape[:2]
+            faces = detect_live_faces(frame, live_face_roi(self.face_track_bbox, width, height))
+            if faces:
+                self.face_frames_since_full += 1
+                face_live_detections_by_mode["roi"].inc()
+                return faces
+            face_live_detections_by_mode["roi_miss"].inc()
+
+        self.face_frames_since_full = 0
+        face_live_detections_by_mode["full"].inc()
+        return detect_live_faces(frame)
+
     def reset(self) -> None:
         self.state = "SEARCHING"
+        self.card_tracker.reset()
         self.recent_hits = deque(maxlen=self.window_size)
         self.lock_start_time: Optional[float] = None
         self.locked_payload: Optional[VerificationPayload] = None
@@ -220,7 +300,11 @@ class VerificationState:
         self.card_face_crop: Optional[np.ndarray] = None
         self.card_face_bbox: Optional[Tuple[float, float, float, float]] = None
         self.ref_embedding: Optional[np.ndarray] = None
+        self._cancel_card_face()
+        self._discard_speculative_card_face()
         self.face_hits = deque(maxlen=self.face_window_size)
+        self.face_track_bbox: Optional[np.ndarray] = None
+        self.face_frames_since_full = 0
         self.face_still_start: Optional[float] = None
         self.face_last_center: Optional[Tuple[float, float]] = None
         self.face_validation_start: Optional[float] = None
@@ -233,6 +317,8 @@ class VerificationState:
 
     def reset_face_validation(self) -> None:
         self.face_hits.clear()
+        self.face_track_bbox = None
+        self.face_frames_since_full = 0
         self.face_still_start = None
         self.face_last_center = None
         self.face_validation_start = None
@@ -258,38 +344,34 @@ class VerificationState:
                 self.lock_start_time = now
         elif self.state == "LOCKING":
             if stable and has_valid:
+                best_valid = max(
+                    detection.valid_boxes,
+                    key=lambda b: (b[2] - b[0]) * (b[3] - b[1]),
+                )
+                bbox = best_valid[:4]
                 if self.lock_start_time and now - self.lock_start_time >= self.lock_delay:
-                    best_valid = max(
-                        detection.valid_boxes,
-                        key=lambda b: (b[2] - b[0]) * (b[3] - b[1]),
-                    )
-                    bbox = best_valid[:4]
                     confidence = best_valid[4]
                     area_ratio = best_valid[5]
-                    card_crop = self._crop_frame(frame, bbox)
+
+                    self.card_face_crop = None
+                    self.card_face_bbox = None
+                    self.ref_embedding = None
+                    self._cancel_card_face()
+                    # Face extraction runs off the frame path; the LOCKED reply goes out now
+                    # and the router sends CARD_FACE_READY when the future resolves.
+                    speculative = self._take_speculative_card_face(bbox)
+                    if speculative is not None:
+                        card_crop = speculative.card_crop
+                        self.card_face_future = _embed_when_taken(speculative.future)
+                    else:
+                        card_crop = self._crop_frame(frame, bbox)
+                        self.card_face_future = submit_background(self._extract_card_face_job, card_crop)
                     crop = self._encode_image(card_crop)
                     self.card_crop = card_crop
 
-                    face_crop, face_bbox, ref_embedding = extract_card_face(
-                        card_crop, extract_embedding=False
-                    )
-                    self.card_face_crop = face_crop
-                    self.card_face_bbox = face_bbox
-                    self.ref_embedding = ref_embedding
-
                     self.ref_embedding_attempted = False
                     self.reset_face_validation()
 
-                    normalized_face_bbox = None
-                    if face_bbox and card_crop is not None and card_crop.size > 0:
-                        crop_height, crop_width = card_crop.shape[:2]
-                        normalized_face_bbox = (
-                            float(face_bbox[0]) / float(crop_width),
-                            float(face_bbox[1]) / float(crop_height),
-                            float(face_bbox[2]) / float(crop_width),
-                            float(face_bbox[3]) / float(crop_height),
-                        )
-
                     self.state = "LOCKED"
                     self.locked_payload = VerificationPayload(
                         state=self.state,
@@ -300,13 +382,14 @@ class VerificationState:
                         frame_height=detection.frame_height,
                         too_small=area_ratio < MIN_AREA_RATIO,
                         crop=crop,
-                        face_crop=self._encode_image(face_crop),
-                        face_bbox=normalized_face_bbox,
+                        face_pending=True,
                     )
                     return self.locked_payload
+                self._speculate_card_face(frame, bbox)
             else:
                 self.state = "SEARCHING"
                 self.lock_start_time = None
+                self._discard_speculative_card_face()
 
         return VerificationPayload(
             state=self.state,
@@ -318,6 +401,112 @@ class VerificationState:
             too_small=detection.too_small,
         )
 
+    def _extract_card_face_job(self, card_crop: np.ndarray, embed: bool = True) -> CardFaceResult:
+        # Runs on the background or speculative pool: must not touch mutable session state.
+        face_crop, face_bbox, _ = extract_card_face(card_crop, extract_embedding=False)
+
+        normalized_face_bbox = None
+        if face_bbox and card_crop is not None and card_crop.size > 0:
+            crop_height, crop_width = card_crop.shape[:2]
+            normalized_face_bbox = (
+                float(face_bbox[0]) / float(crop_width),
+                float(face_bbox[1]) / float(crop_height),
+                float(face_bbox[2]) / float(crop_width),
+                float(face_bbox[3]) / float(crop_height),
+            )
+
+        embedding_future = None
+        if face_crop is not None and embed:
+            # Embed the card face while the user turns to the camera.
+            embedding_future = submit_background(card_face_embedding, face_crop)
+
+        return CardFaceResult(
+            face_crop=face_crop,
+            face_bbox=face_bbox,
+            normalized_face_bbox=normalized_face_bbox,
+            encoded_face_crop=self._encode_image(face_crop),
+            embedding_future=embedding_future,
+        )
+
+    def _apply_card_face(self, wait: bool) -> None:
+        future = self.card_face_future
+        if future is None or (not wait and not future.done()):
+            return
+        self.card_face_future = None
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"[VerificationState] Card face extraction failed: {e}")
+            result = CardFaceResult(None, None, None, "", None)
+
+        self.card_face_crop = result.face_crop
+        self.card_face_bbox = result.face_bbox
+        self.ref_embedding_future = result.embedding_future
+        if self.locked_payload is not None:
+            self.locked_payload.face_crop = result.encoded_face_crop
+            self.locked_payload.face_bbox = result.normalized_face_bbox
+            self.locked_payload.face_pending = False
+
+    def _speculate_card_face(self, frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> None:
+        # While LOCKING, extract the face from the current best crop so the locking
+        # frame can reuse it if the card has not moved. One job in flight per session.
+        if not CARD_FACE_SPECULATIVE:
+            return
+        entry = self.speculative_card_face
+        if entry is not None:
+            if not entry.future.done() or _bbox_iou(entry.bbox, bbox) >= CARD_FACE_SPECULATIVE_IOU:
+                return
+            self._discard_speculative_card_face()
+        card_crop = self._crop_frame(frame, bbox)
+        # Speculation has its own capped pool and skips the embedding, so guesses never
+        # queue ahead of lock-time extractions and embeddings on the background pool.
+        future = submit_speculative(self._extract_card_face_job, card_crop, False)
+        if future is None:
+            return
+        self.speculative_card_face = SpeculativeCardFace(bbox=bbox, card_crop=card_crop, future=future)
+
+    def _take_speculative_card_face(self, bbox: Tuple[int, int, int, int]) -> Optional[SpeculativeCardFace]:
+        if not CARD_FACE_SPECULATIVE:
+            return None
+        entry = self.speculative_card_face
+        if (
+            entry is not None
+            and not entry.future.cancelled()
+            and _bbox_iou(entry.bbox, bbox) >= CARD_FACE_SPECULATIVE_IOU
+        ):
+            self.speculative_card_face = None
+            card_face_speculative_total.labels("hit").inc()
+            return entry
+        self._discard_speculative_card_face()
+        card_face_speculative_total.labels("miss").inc()
+        return None
+
+    def _discard_speculative_card_face(self) -> None:
+        if self.speculative_card_face is not None:
+            _drop_card_face_future(self.speculative_card_face.future)
+        self.speculative_card_face = None
+
+    def _cancel_card_face(self) -> None:
+        if self.card_face_future is not None:
+            _drop_card_face_future(self.card_face_future)
+        self.card_face_future = None
+        self._cancel_ref_embedding()
+
+    def _cancel_ref_embedding(self) -> None:
+        if self.ref_embedding_future is not None:
+            self.ref_embedding_future.cancel()
+        self.ref_embedding_future = None
+
+    def _wait_ref_embedding(self) -> Optional[np.ndarray]:
+        future = self.ref_embedding_future
+        if future is None or future.cancelled():
+            return card_face_embedding(self.card_face_crop)
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"[VerificationState] Reference embedding failed: {e}")
+            return None
+
     def _encode_crop(self, frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> str:
         crop = self._crop_frame(frame, bbox)
         return self._encode_image(crop)
@@ -341,8 +530,9 @@ class VerificationState:
     def _encode_image(self, frame: Optional[np.ndarray]) -> str:
         if frame is None or frame.size == 0:
             return ""
-        success, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 88])
-        if not success:
-            return ""
-        encoded_bytes = base64.b64encode(encoded.tobytes()).decode("ascii")
+        with span("encode_image"):
+            success, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 88])
+            if not success:
+                return ""
+            encoded_bytes = base64.b64encode(encoded.tobytes()).decode("ascii")
         return f"data:image/jpeg;base64,{encoded_bytes}"
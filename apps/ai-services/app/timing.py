@@ -0,0 +1,57 @@
+"""Per-stage latency spans for the verification pipeline.
+
+`span(stage)` times a block into `ai_pipeline_stage_seconds{stage}`. After a
+frame handler calls `start_frame()`, the same durations are also summed into
+that frame's breakdown, which a session can ask to receive with every reply
+(`hello timing`). The breakdown lives in a ContextVar: it follows the frame
+into the inference executor, which runs each job in a copy of the caller's
+context, but not into background jobs, batcher threads or other sessions.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from app.metrics import pipeline_stage_by_name
+
+AI_STAGE_TIMING = os.getenv("AI_STAGE_TIMING", "on").strip().lower() == "on"
+
+_frame_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("frame_timings", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    if not AI_STAGE_TIMING:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record(stage: str, seconds: float) -> None:
+    pipeline_stage_by_name[stage].observe(seconds)
+    timings = _frame_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def start_frame() -> Dict[str, float]:
+    """Start collecting the breakdown of the frame handled in the current context."""
+    timings: Dict[str, float] = {}
+    _frame_timings.set(timings)
+    return timings
+
+
+def leave_frame() -> None:
+    """Stop adding spans to a frame breakdown, e.g. in a task spawned while handling a frame."""
+    _frame_timings.set(None)
+
+
+def breakdown_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {stage: round(seconds * 1000.0, 2) for stage, seconds in timings.items()}
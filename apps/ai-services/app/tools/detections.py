@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+
+def boxes_from_result(result) -> Tuple[np.ndarray, np.ndarray]:
+    """xyxy (N, 4) and conf (N,) of a detector result in one device-to-host copy each."""
+    boxes = result.boxes if result is not None else None
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros((0,), dtype=np.float32)
+    xyxy = boxes.xyxy
+    conf = boxes.conf
+    if hasattr(xyxy, "cpu"):
+        xyxy, conf = xyxy.cpu().numpy(), conf.cpu().numpy()
+    return np.asarray(xyxy, dtype=np.float32).reshape(-1, 4), np.asarray(conf, dtype=np.float32).reshape(-1)
+
+
+@dataclass
+class Detections:
+    """Array-backed face detections: row i of every array describes face i.
+
+    Truthiness and len() behave like the old list of face dicts; `face(i)`
+    and `best()` build the dict for one face only when a caller needs it.
+    """
+
+    xyxy: np.ndarray
+    score: np.ndarray
+    area_ratio: np.ndarray
+    kps: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        return cls(
+            xyxy=np.zeros((0, 4), dtype=np.float32),
+            score=np.zeros((0,), dtype=np.float32),
+            area_ratio=np.zeros((0,), dtype=np.float64),
+        )
+
+    @classmethod
+    def from_boxes(
+        cls,
+        xyxy: np.ndarray,
+        score: np.ndarray,
+        width: int,
+        height: int,
+        min_area_ratio: float,
+        max_area_ratio: float,
+        clamp_origin: bool = False,
+        kps: Optional[np.ndarray] = None,
+    ) -> "Detections":
+        """Clamp boxes to the frame and keep those whose area ratio is in range.
+
+        YOLO boxes are only clamped at the far edges; `clamp_origin` also
+        clamps the top-left corner (SCRFD and region-of-interest boxes).
+        """
+        boxes = np.array(xyxy, dtype=np.float64).reshape(-1, 4)
+        if clamp_origin:
+            boxes[:, :2] = np.maximum(boxes[:, :2], 0.0)
+            boxes[:, 2] = np.minimum(boxes[:, 2], float(width))
+            boxes[:, 3] = np.minimum(boxes[:, 3], float(height))
+        else:
+            boxes[:, [0, 2]] = np.minimum(boxes[:, [0, 2]], float(width))
+            boxes[:, [1, 3]] = np.minimum(boxes[:, [1, 3]], float(height))
+        area = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 0.0)
+        area_ratio = area / float(max(width * height, 1))
+        keep = (area_ratio >= min_area_ratio) & (area_ratio <= max_area_ratio)
+        return cls(
+            xyxy=boxes[keep].astype(np.float32),
+            score=np.asarray(score, dtype=np.float32).reshape(-1)[keep],
+            area_ratio=area_ratio[keep],
+            kps=kps[keep] if kps is not None else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self.face(index) for index in range(len(self)))
+
+    def face(self, index: int) -> dict:
+        face = {
+            "bbox": self.xyxy[index],
+            "score": float(self.score[index]),
+            "area_ratio": float(self.area_ratio[index]),
+        }
+        if self.kps is not None:
+            face["kps"] = self.kps[index]
+        return face
+
+    def best_index(self) -> Optional[int]:
+        """Highest score, ties broken by area ratio, first wins (same as max() on the dicts)."""
+        if len(self) == 0:
+            return None
+        tied = np.flatnonzero(self.score == self.score.max())
+        return int(tied[np.argmax(self.area_ratio[tied])])
+
+    def best(self) -> Optional[dict]:
+        index = self.best_index()
+        return self.face(index) if index is not None else None
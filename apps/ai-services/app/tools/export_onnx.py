@@ -0,0 +1,101 @@
+"""Export the card / face YOLO weights to ONNX and static INT8 ONNX.
+
+Writes `<name>.onnx` (FP32) and, when a calibration folder is given,
+`<name>.int8.onnx` next to the source weights. Point AI_MODEL_BACKEND /
+FACE_MODEL_BACKEND at `onnx` or `onnx-int8` to serve them.
+
+Usage:
+    python -m app.tools.export_onnx models/card.pt --calibration-dir samples/cards
+    python -m app.tools.export_onnx models/face.pt --calibration-dir samples/faces --imgsz 640
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+from pathlib import Path
+from typing import Iterator, Optional
+
+import cv2
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from app.tools.model_backend import preprocess
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+class FolderCalibrationReader(CalibrationDataReader):
+    """Feeds letterboxed sample frames to the INT8 calibrator one at a time."""
+
+    def __init__(self, folder: Path, input_name: str, imgsz: int, limit: int) -> None:
+        self.input_name = input_name
+        self.imgsz = imgsz
+        paths = sorted(path for path in folder.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+        self._paths: Iterator[Path] = iter(paths[:limit])
+
+    def get_next(self) -> Optional[dict]:
+        for path in self._paths:
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            blob, _ = preprocess([image], self.imgsz)
+            return {self.input_name: blob}
+        return None
+
+
+def export_fp32(weights: Path, imgsz: int) -> Path:
+    from ultralytics import YOLO
+
+    exported = Path(YOLO(str(weights)).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+    target = weights.with_suffix(".onnx")
+    if exported.resolve() != target.resolve():
+        shutil.move(str(exported), target)
+    return target
+
+
+def quantize_int8(fp32_path: Path, calibration_dir: Path, imgsz: int, limit: int) -> Path:
+    prepared = fp32_path.with_name(f"{fp32_path.stem}.prep.onnx")
+    target = fp32_path.with_name(f"{fp32_path.stem}.int8.onnx")
+    quant_pre_process(str(fp32_path), str(prepared))
+
+    session = ort.InferenceSession(str(prepared), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    reader = FolderCalibrationReader(calibration_dir, input_name, imgsz, limit)
+    quantize_static(
+        str(prepared),
+        str(target),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    prepared.unlink(missing_ok=True)
+    return target
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("weights", type=Path, help="ultralytics .pt weights")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calibration-dir", type=Path, help="folder of sample frames for INT8 calibration")
+    parser.add_argument("--calibration-limit", type=int, default=200)
+    args = parser.parse_args()
+
+    fp32_path = export_fp32(args.weights, args.imgsz)
+    print(f"FP32 ONNX: {fp32_path}")
+    if args.calibration_dir:
+        int8_path = quantize_int8(fp32_path, args.calibration_dir, args.imgsz, args.calibration_limit)
+        print(f"INT8 ONNX: {int8_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import math
 import os
+import threading
 from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
@@ -11,8 +12,17 @@ import numpy as np
 import onnxruntime as ort
 import torch
 from insightface.app import FaceAnalysis
+from insightface.utils import face_align
 from ultralytics import YOLO
 
+from app.inference_server import remote_client
+from app.metrics import face_rotation_attempts
+from app.model_registry import registry
+from app.resolution import ladder
+from app.timing import span
+from app.tools.detections import Detections, boxes_from_result
+from app.tools.model_backend import is_fork_safe, load_detector, resolve_backend, weight_filename
+
 LIVE_FACE_CONF_THRES = 0.5
 STILLNESS_SEC = 3.0
 STILLNESS_PIXELS = 12
@@ -29,19 +39,46 @@ FACE_ANCHORS_PORTRAIT = ((0.33, 0.33),)
 FACE_ANCHORS_LANDSCAPE = ((0.22, 0.5), (0.3, 0.5))
 FACE_TOP_SCORE_MIN = 0.35
 FACE_SCORE_GATE = 0.9
-MAX_FRAME_WIDTH = 1280
-
-
-def _resolve_face_model_path() -> Path:
+FACE_ROTATION_SEARCH = os.getenv("FACE_ROTATION_SEARCH", "coarse").strip().lower()
+FACE_EARLY_EXIT_SCORE = float(os.getenv("FACE_EARLY_EXIT_SCORE", "0.7"))
+FACE_EARLY_EXIT_ANCHOR = float(os.getenv("FACE_EARLY_EXIT_ANCHOR", "0.8"))
+FACE_SEARCH_MAX_SIDE = int(os.getenv("FACE_SEARCH_MAX_SIDE", "480"))
+# Model input for the rotation search; defaults to the thumbnail size so it is not upscaled.
+FACE_SEARCH_IMGSZ = int(
+    os.getenv("FACE_SEARCH_IMGSZ", str(int(math.ceil(FACE_SEARCH_MAX_SIDE / 32.0)) * 32 or 640))
+)
+INSIGHTFACE_DET_SIZE = int(os.getenv("INSIGHTFACE_DET_SIZE", "320"))
+INSIGHTFACE_PAD_RATIO = 0.25
+LIVE_FACE_DETECTOR = os.getenv("LIVE_FACE_DETECTOR", "scrfd").strip().lower()
+LIVE_FACE_DET_SIZE = int(os.getenv("LIVE_FACE_DET_SIZE", "640"))
+LIVE_FACE_ROI_DET_SIZE = int(os.getenv("LIVE_FACE_ROI_DET_SIZE", "320"))
+FACE_TRACKING = os.getenv("FACE_TRACKING", "on").strip().lower() == "on"
+FACE_TRACK_FULL_EVERY = int(os.getenv("FACE_TRACK_FULL_EVERY", "10"))
+FACE_TRACK_PAD_RATIO = float(os.getenv("FACE_TRACK_PAD_RATIO", "0.75"))
+MAX_FRAME_WIDTH = int(os.getenv("FACE_FRAME_MAX_WIDTH", "1280"))
+
+# Ultralytics predictors are not safe to call from several executor threads at once.
+_FACE_MODEL_LOCK = threading.Lock()
+
+
+def _env_face_model_path() -> Optional[Path]:
     env_path = os.getenv("FACE_MODEL_PATH")
     if env_path:
         return Path(env_path).expanduser().resolve()
+    return None
+
+
+def _resolve_face_model_path(backend: str) -> Path:
+    env_path = _env_face_model_path()
+    if env_path:
+        return env_path
 
     base_dir = Path(__file__).resolve().parents[2]
+    filename = weight_filename("face", backend)
     candidates = [
-        base_dir / "models" / "face.pt",
-        base_dir / "face.pt",
-        base_dir.parent.parent / "models" / "face.pt",
+        base_dir / "models" / filename,
+        base_dir / filename,
+        base_dir.parent.parent / "models" / filename,
     ]
     for path in candidates:
         if path.exists():
@@ -68,31 +105,55 @@ def _select_providers() -> list[str]:
 
 
 def _load_face_model() -> YOLO:
-    model_path = _resolve_face_model_path()
+    backend = resolve_backend("FACE_MODEL_BACKEND", _env_face_model_path())
+    model_path = _resolve_face_model_path(backend)
     if not model_path.exists():
         raise FileNotFoundError(
             f"Face model not found at {model_path}. Set FACE_MODEL_PATH to your weights."
         )
     device = _resolve_device()
-    return YOLO(str(model_path)).to(device)
+    return load_detector(model_path, device, backend)
 
 
 def _load_insightface() -> FaceAnalysis:
     providers = _select_providers()
     use_cuda = "CUDAExecutionProvider" in providers
-    app = FaceAnalysis(name="buffalo_l", providers=providers)
-    app.prepare(ctx_id=0 if use_cuda else -1, det_size=(640, 640), det_thresh=0.2)
+    # Only SCRFD detection and the ArcFace embedding are used; skip landmarks and gender/age.
+    app = FaceAnalysis(
+        name="buffalo_l",
+        providers=providers,
+        allowed_modules=["detection", "recognition"],
+    )
+    det_size = (INSIGHTFACE_DET_SIZE, INSIGHTFACE_DET_SIZE)
+    app.prepare(ctx_id=0 if use_cuda else -1, det_size=det_size, det_thresh=0.2)
     return app
 
 
-@lru_cache(maxsize=1)
+def _warmup_face_model(model: YOLO) -> None:
+    with _FACE_MODEL_LOCK:
+        model(np.zeros((480, 640, 3), dtype=np.uint8), conf=FACE_CONF_THRESHOLD, verbose=False)
+
+
+def _warmup_insightface(app: FaceAnalysis) -> None:
+    app.get(np.zeros((256, 256, 3), dtype=np.uint8))
+
+
+registry.register(
+    "face",
+    _load_face_model,
+    _warmup_face_model,
+    fork_safe=is_fork_safe("FACE_MODEL_BACKEND", _env_face_model_path(), _resolve_device()),
+)
+# InsightFace runs on onnxruntime, whose sessions start thread pools when created.
+registry.register("insightface", _load_insightface, _warmup_insightface, fork_safe=False)
+
+
 def get_face_model() -> YOLO:
-    return _load_face_model()
+    return registry.get("face")
 
 
-@lru_cache(maxsize=1)
 def get_insightface_app() -> FaceAnalysis:
-    return _load_insightface()
+    return registry.get("insightface")
 
 
 def resize_frame(frame: np.ndarray) -> np.ndarray:
@@ -160,6 +221,68 @@ def rotate_image_quadrant(image: np.ndarray, angle: float) -> np.ndarray:
     return rotate_image(image, angle)
 
 
+@lru_cache(maxsize=128)
+def _rotation_geometry(
+    height: int, width: int, angle: float
+) -> tuple[np.ndarray, int, int, Optional[Tuple[int, int, int, int]]]:
+    center = (width / 2, height / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    cos = abs(matrix[0, 0])
+    sin = abs(matrix[0, 1])
+    new_width = int(height * sin + width * cos)
+    new_height = int(height * cos + width * sin)
+    matrix[0, 2] += (new_width / 2) - center[0]
+    matrix[1, 2] += (new_height / 2) - center[1]
+    matrix.setflags(write=False)
+
+    corners = np.array(
+        [[0.0, 0.0, 1.0], [width, 0.0, 1.0], [0.0, height, 1.0], [width, height, 1.0]]
+    )
+    projected = corners @ matrix.T
+    x1 = max(0, int(math.floor(projected[:, 0].min())))
+    y1 = max(0, int(math.floor(projected[:, 1].min())))
+    x2 = min(new_width, int(math.ceil(projected[:, 0].max())))
+    y2 = min(new_height, int(math.ceil(projected[:, 1].max())))
+    content = (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+    return matrix, new_width, new_height, content
+
+
+def rotate_for_search(
+    image: np.ndarray, angle: float
+) -> tuple[np.ndarray, Optional[Tuple[int, int, int, int]]]:
+    """Rotate like rotate_image and return the rotated content box from geometry.
+
+    Multiples of 90 degrees use lossless cv2.rotate instead of warpAffine, and
+    the content box comes from the projected source corners instead of a
+    pixel mask over the rotated canvas.
+    """
+    height, width = image.shape[:2]
+    if height == 0 or width == 0:
+        return image, None
+    angle = angle % 360
+    if angle == 0:
+        return image, (0, 0, width, height)
+    if angle == 90:
+        rotated = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return rotated, (0, 0, height, width)
+    if angle == 180:
+        return cv2.rotate(image, cv2.ROTATE_180), (0, 0, width, height)
+    if angle == 270:
+        rotated = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        return rotated, (0, 0, height, width)
+
+    matrix, new_width, new_height, content = _rotation_geometry(height, width, float(angle))
+    rotated = cv2.warpAffine(
+        image,
+        matrix,
+        (new_width, new_height),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0),
+    )
+    return rotated, content
+
+
 def content_bbox(image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
     if image is None or image.size == 0:
         return None
@@ -182,35 +305,68 @@ def _anchors_for_content(width: int, height: int) -> tuple[tuple[float, float],
     return FACE_ANCHORS_PORTRAIT
 
 
+def _faces_from_result(result, width: int, height: int) -> Detections:
+    xyxy, conf = boxes_from_result(result)
+    return Detections.from_boxes(xyxy, conf, width, height, FACE_MIN_AREA_RATIO, FACE_MAX_AREA_RATIO)
+
+
 def detect_faces_yolo(
     image: np.ndarray,
     face_model: YOLO,
     conf_threshold: float = FACE_CONF_THRESHOLD,
-) -> list[dict]:
-    results = face_model(image, conf=conf_threshold, verbose=False)
+    imgsz: Optional[int] = None,
+) -> Detections:
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    with _FACE_MODEL_LOCK:
+        results = face_model(image, conf=conf_threshold, verbose=False, **kwargs)
     if not results:
-        return []
-    boxes = results[0].boxes if results else None
-    if boxes is None:
-        return []
-
+        return Detections.empty()
     height, width = image.shape[:2]
-    faces: list[dict] = []
-    for box in boxes:
-        x1, y1, x2, y2 = box.xyxy[0].tolist()
-        score = float(box.conf[0]) if box.conf is not None else 0.0
-        area = max(0.0, (x2 - x1) * (y2 - y1))
-        area_ratio = area / float(max(width * height, 1))
-        if area_ratio < FACE_MIN_AREA_RATIO or area_ratio > FACE_MAX_AREA_RATIO:
+    return _faces_from_result(results[0], width, height)
+
+
+def letterbox_to_common_size(images: list[np.ndarray]) -> list[np.ndarray]:
+    """Pad images bottom/right to a shared canvas so pixel coordinates are unchanged."""
+    max_height = max(image.shape[0] for image in images)
+    max_width = max(image.shape[1] for image in images)
+    padded = []
+    for image in images:
+        height, width = image.shape[:2]
+        if height == max_height and width == max_width:
+            padded.append(image)
             continue
-        faces.append(
-            {
-                "bbox": np.array([x1, y1, x2, y2], dtype=np.float32),
-                "score": score,
-                "area_ratio": area_ratio,
-            }
+        padded.append(
+            cv2.copyMakeBorder(
+                image,
+                0,
+                max_height - height,
+                0,
+                max_width - width,
+                cv2.BORDER_CONSTANT,
+                value=(0, 0, 0),
+            )
         )
-    return faces
+    return padded
+
+
+def detect_faces_yolo_batch(
+    images: list[np.ndarray],
+    face_model: YOLO,
+    conf_threshold: float = FACE_CONF_THRESHOLD,
+    imgsz: Optional[int] = None,
+) -> list[Detections]:
+    if not images:
+        return []
+    canvases = letterbox_to_common_size(images)
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    with _FACE_MODEL_LOCK:
+        results = face_model(canvases, conf=conf_threshold, verbose=False, **kwargs)
+    batch_faces: list[Detections] = []
+    for index, image in enumerate(images):
+        height, width = image.shape[:2]
+        result = results[index] if results and index < len(results) else None
+        batch_faces.append(_faces_from_result(result, width, height))
+    return batch_faces
 
 
 def face_upright_metrics(bbox: np.ndarray) -> tuple[float, bool]:
@@ -230,7 +386,7 @@ def normalize_face_orientation(face_image: np.ndarray, face_model: YOLO) -> tupl
         faces = detect_faces_yolo(rotated, face_model)
         if not faces:
             continue
-        face = max(faces, key=lambda f: (f["score"], f["area_ratio"]))
+        face = faces.best()
         aspect, upright = face_upright_metrics(face["bbox"])
         height, width = rotated.shape[:2]
         x1, y1, x2, y2 = face["bbox"]
@@ -258,54 +414,51 @@ def normalize_face_orientation(face_image: np.ndarray, face_model: YOLO) -> tupl
     }
 
 
-def find_best_rotation_yolo(image: np.ndarray, face_model: YOLO) -> tuple[dict | None, str | None]:
-    best = None
-    errors: dict[str, int] = {}
-    best_key = None
+def _rotation_candidate(
+    angle: int,
+    rotated: np.ndarray,
+    content: Optional[Tuple[int, int, int, int]],
+    faces: Detections,
+    errors: dict[str, int],
+) -> Optional[dict]:
+    if content is None:
+        errors["no content"] = errors.get("no content", 0) + 1
+        return None
+    cx1, cy1, cx2, cy2 = content
+    content_w = max(cx2 - cx1, 1)
+    content_h = max(cy2 - cy1, 1)
+    anchors = _anchors_for_content(content_w, content_h)
 
-    candidates: list[dict] = []
-    for angle in range(0, 360, FACE_ROTATION_STEP_DEG):
-        rotated = rotate_image(image, angle)
-        content = content_bbox(rotated)
-        if content is None:
-            errors["no content"] = errors.get("no content", 0) + 1
-            continue
-        cx1, cy1, cx2, cy2 = content
-        content_w = max(cx2 - cx1, 1)
-        content_h = max(cy2 - cy1, 1)
-        anchors = _anchors_for_content(content_w, content_h)
+    if not faces:
+        errors["no faces"] = errors.get("no faces", 0) + 1
+        return None
+    face = faces.best()
+    x1, y1, x2, y2 = face["bbox"]
+    face_w = max(float(x2 - x1), 1.0)
+    face_h = max(float(y2 - y1), 1.0)
+    aspect = face_h / face_w
+    upright = aspect >= 1.05
+    cx = ((x1 + x2) / 2.0 - cx1) / float(content_w)
+    cy = ((y1 + y2) / 2.0 - cy1) / float(content_h)
+    anchor_scores = [1.0 - math.hypot(cx - ax, cy - ay) for ax, ay in anchors]
+    anchor_score = max(anchor_scores) if anchor_scores else 0.0
+    top_score = 1.0 - cy
+    angle_off = angle % 90
+    angle_off = min(angle_off, 90 - angle_off)
+    angle_bonus = 1.0 - (angle_off / 45.0)
+    return {
+        "angle": angle,
+        "image": rotated,
+        "face": face,
+        "anchor_score": anchor_score,
+        "top_score": top_score,
+        "angle_bonus": angle_bonus,
+        "aspect": aspect,
+        "upright": upright,
+    }
 
-        faces = detect_faces_yolo(rotated, face_model)
-        if not faces:
-            errors["no faces"] = errors.get("no faces", 0) + 1
-            continue
-        face = max(faces, key=lambda f: (f["score"], f["area_ratio"]))
-        x1, y1, x2, y2 = face["bbox"]
-        face_w = max(float(x2 - x1), 1.0)
-        face_h = max(float(y2 - y1), 1.0)
-        aspect = face_h / face_w
-        upright = aspect >= 1.05
-        cx = ((x1 + x2) / 2.0 - cx1) / float(content_w)
-        cy = ((y1 + y2) / 2.0 - cy1) / float(content_h)
-        anchor_scores = [1.0 - math.hypot(cx - ax, cy - ay) for ax, ay in anchors]
-        anchor_score = max(anchor_scores) if anchor_scores else 0.0
-        top_score = 1.0 - cy
-        angle_off = angle % 90
-        angle_off = min(angle_off, 90 - angle_off)
-        angle_bonus = 1.0 - (angle_off / 45.0)
-        candidates.append(
-            {
-                "angle": angle,
-                "image": rotated,
-                "face": face,
-                "anchor_score": anchor_score,
-                "top_score": top_score,
-                "angle_bonus": angle_bonus,
-                "aspect": aspect,
-                "upright": upright,
-            }
-        )
 
+def _select_rotation(candidates: list[dict], errors: dict[str, int]) -> tuple[dict | None, str | None]:
     if not candidates:
         summary = ", ".join(f"{key}:{count}" for key, count in sorted(errors.items()))
         detail = f" ({summary})" if summary else ""
@@ -325,48 +478,135 @@ def find_best_rotation_yolo(image: np.ndarray, face_model: YOLO) -> tuple[dict |
     if upright_filtered:
         filtered = upright_filtered
 
+    best = None
+    best_key = None
     for candidate in filtered:
-        angle = candidate["angle"]
-        rotated = candidate["image"]
         face = candidate["face"]
-        anchor_score = candidate["anchor_score"]
-        top_score = candidate["top_score"]
-        angle_bonus = candidate["angle_bonus"]
         key = (
-            anchor_score,
+            candidate["anchor_score"],
             face["score"],
             face["area_ratio"],
-            top_score,
-            angle_bonus,
+            candidate["top_score"],
+            candidate["angle_bonus"],
         )
         if best_key is None or key > best_key:
             best_key = key
-            best = {
-                "angle": angle,
-                "image": rotated,
-                "face": face,
-                "anchor_score": anchor_score,
-                "top_score": top_score,
-                "angle_bonus": angle_bonus,
-                "aspect": candidate["aspect"],
-                "upright": candidate["upright"],
-            }
+            best = dict(candidate)
     return best, None
 
 
+def _score_rotations(
+    image: np.ndarray,
+    angles: list[int],
+    face_model: YOLO,
+    errors: dict[str, int],
+) -> list[dict]:
+    rotations = [rotate_for_search(image, angle) for angle in angles]
+    batch_faces = detect_faces_yolo_batch(
+        [rotated for rotated, _ in rotations], face_model, imgsz=FACE_SEARCH_IMGSZ
+    )
+    candidates: list[dict] = []
+    for angle, (rotated, content), faces in zip(angles, rotations, batch_faces):
+        candidate = _rotation_candidate(angle, rotated, content, faces, errors)
+        if candidate is not None:
+            candidates.append(candidate)
+    return candidates
+
+
+def _is_confident_rotation(candidate: dict) -> bool:
+    return (
+        candidate["upright"]
+        and candidate["face"]["score"] >= FACE_EARLY_EXIT_SCORE
+        and candidate["anchor_score"] >= FACE_EARLY_EXIT_ANCHOR
+        and candidate["top_score"] >= FACE_TOP_SCORE_MIN
+    )
+
+
+def _rotation_stages() -> list[list[int]]:
+    angles = list(range(0, 360, FACE_ROTATION_STEP_DEG))
+    if FACE_ROTATION_SEARCH != "coarse":
+        return [angles]
+    quadrants = [angle for angle in angles if angle % 90 == 0]
+    diagonals = [angle for angle in angles if angle % 90 != 0]
+    # Most cards are held upright, so 0 degrees gets its own pass before the other quadrants.
+    stages = [quadrants[:1], quadrants[1:], diagonals]
+    return [stage for stage in stages if stage]
+
+
+def find_best_rotation_yolo(image: np.ndarray, face_model: YOLO) -> tuple[dict | None, str | None]:
+    """Search card rotations for the best-placed upright face.
+
+    In "coarse" mode quadrant rotations are tried first and the search stops
+    once a candidate clears the early-exit thresholds; "full" scores every
+    rotation in one batched call.
+    """
+    errors: dict[str, int] = {}
+    candidates: list[dict] = []
+    tried = 0
+    for stage in _rotation_stages():
+        tried += len(stage)
+        candidates.extend(_score_rotations(image, stage, face_model, errors))
+        if any(_is_confident_rotation(candidate) for candidate in candidates):
+            break
+    face_rotation_attempts.observe(tried)
+    return _select_rotation(candidates, errors)
+
+
+def find_best_rotation_yolo_sequential(
+    image: np.ndarray, face_model: YOLO
+) -> tuple[dict | None, str | None]:
+    """Reference implementation: one face-model call per rotation.
+
+    Kept to check that the batched search picks the same rotation.
+    """
+    errors: dict[str, int] = {}
+    candidates: list[dict] = []
+    for angle in range(0, 360, FACE_ROTATION_STEP_DEG):
+        rotated, content = rotate_for_search(image, angle)
+        faces = (
+            detect_faces_yolo(rotated, face_model, imgsz=FACE_SEARCH_IMGSZ)
+            if content is not None
+            else Detections.empty()
+        )
+        candidate = _rotation_candidate(angle, rotated, content, faces, errors)
+        if candidate is not None:
+            candidates.append(candidate)
+    return _select_rotation(candidates, errors)
+
+
+def _search_thumbnail(image: np.ndarray) -> tuple[np.ndarray, float]:
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if FACE_SEARCH_MAX_SIDE <= 0 or longest <= FACE_SEARCH_MAX_SIDE:
+        return image, 1.0
+    scale = FACE_SEARCH_MAX_SIDE / float(longest)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
 def extract_upright_face(card_image: np.ndarray, face_model: YOLO):
     if card_image is None or card_image.size == 0:
         return None, None, "empty card image"
 
-    best, error = find_best_rotation_yolo(card_image, face_model)
+    # Search rotations on a thumbnail, then crop the winning face from the full-resolution card.
+    thumbnail, scale = _search_thumbnail(card_image)
+    best, error = find_best_rotation_yolo(thumbnail, face_model)
     if error or best is None:
         return None, None, error or "no valid face"
 
     rotation_angle = float(best["angle"])
     face = best["face"]
-    rotated = best["image"]
+    if scale == 1.0:
+        rotated = best["image"]
+        face_bbox = face["bbox"]
+    else:
+        rotated, _ = rotate_for_search(card_image, rotation_angle)
+        thumb_height, thumb_width = best["image"].shape[:2]
+        scale_x = rotated.shape[1] / float(max(thumb_width, 1))
+        scale_y = rotated.shape[0] / float(max(thumb_height, 1))
+        face_bbox = face["bbox"] * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
 
-    crop = crop_face_from_bbox(rotated, face["bbox"], PADDING_RATIO)
+    crop = crop_face_from_bbox(rotated, face_bbox, PADDING_RATIO)
     if crop is None or crop.size == 0:
         return None, None, "face crop is empty"
     if crop.shape[0] < MIN_FACE_SIZE or crop.shape[1] < MIN_FACE_SIZE:
@@ -376,7 +616,7 @@ def extract_upright_face(card_image: np.ndarray, face_model: YOLO):
         "rotation": rotation_angle,
         "confidence": float(face["score"]),
         "area_ratio": float(face["area_ratio"]),
-        "bbox": [float(value) for value in face["bbox"]],
+        "bbox": [float(value) for value in face_bbox],
         "anchor_score": float(best.get("anchor_score", 0.0)),
         "top_score": float(best.get("top_score", 0.0)),
         "angle_bonus": float(best.get("angle_bonus", 0.0)),
@@ -395,40 +635,149 @@ def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b))
 
 
-def pad_image(image: np.ndarray, ratio: float) -> np.ndarray:
-    if ratio <= 0:
-        return image
-    pad_y = int(image.shape[0] * ratio)
-    pad_x = int(image.shape[1] * ratio)
-    return cv2.copyMakeBorder(
+def _embedding_canvas(image: np.ndarray) -> np.ndarray:
+    """Center a face crop on a square canvas sized to the detector input.
+
+    Face crops are tight, and SCRFD misses faces that touch the image
+    border, so the crop gets a fixed margin on every side. Sizing the
+    canvas to the detector input means SCRFD runs without another resize.
+    """
+    height, width = image.shape[:2]
+    side = int(round(max(height, width) * (1.0 + 2.0 * INSIGHTFACE_PAD_RATIO)))
+    scale = INSIGHTFACE_DET_SIZE / float(max(side, 1))
+    resized = cv2.resize(
         image,
-        pad_y,
-        pad_y,
-        pad_x,
-        pad_x,
-        cv2.BORDER_CONSTANT,
-        value=(0, 0, 0),
+        (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+        interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR,
     )
+    canvas = np.zeros((INSIGHTFACE_DET_SIZE, INSIGHTFACE_DET_SIZE, 3), dtype=image.dtype)
+    top = (INSIGHTFACE_DET_SIZE - resized.shape[0]) // 2
+    left = (INSIGHTFACE_DET_SIZE - resized.shape[1]) // 2
+    canvas[top : top + resized.shape[0], left : left + resized.shape[1]] = resized
+    return canvas
 
 
 def get_best_face(app: FaceAnalysis, image: np.ndarray):
     if image is None or image.size == 0:
         return None
-    min_side = min(image.shape[:2])
-    resized = image
-    if min_side < 256:
-        scale = 256 / max(min_side, 1)
-        resized = cv2.resize(image, (int(image.shape[1] * scale), int(image.shape[0] * scale)))
-
-    for pad_ratio in (0.0, 0.25, 0.5):
-        candidate = pad_image(resized, pad_ratio)
-        faces = app.get(candidate)
-        if faces:
-            return max(
-                faces,
-                key=lambda f: (f.det_score, (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1])),
-            )
-    return None
+    faces = app.get(_embedding_canvas(image))
+    if not faces:
+        return None
+    return max(
+        faces,
+        key=lambda f: (f.det_score, (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1])),
+    )
+
+
+def _detect_live_faces_scrfd(
+    frame: np.ndarray,
+    app: FaceAnalysis,
+    roi: Optional[Tuple[int, int, int, int]] = None,
+) -> Detections:
+    height, width = frame.shape[:2]
+    ox, oy = (roi[0], roi[1]) if roi is not None else (0, 0)
+    image = frame[roi[1] : roi[3], roi[0] : roi[2]] if roi is not None else frame
+    size = ladder.size(LIVE_FACE_ROI_DET_SIZE if roi is not None else LIVE_FACE_DET_SIZE)
+    bboxes, kpss = app.det_model.detect(image, input_size=(size, size))
+    if bboxes is None or len(bboxes) == 0:
+        return Detections.empty()
+
+    keep = bboxes[:, 4] >= LIVE_FACE_CONF_THRES
+    xyxy = bboxes[keep, :4].astype(np.float64) + (ox, oy, ox, oy)
+    kps = kpss[keep] + np.array([ox, oy], dtype=np.float32) if kpss is not None else None
+    return Detections.from_boxes(
+        xyxy,
+        bboxes[keep, 4],
+        width,
+        height,
+        FACE_MIN_AREA_RATIO,
+        FACE_MAX_AREA_RATIO,
+        clamp_origin=True,
+        kps=kps,
+    )
+
+
+def _detect_live_faces_yolo(frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> Detections:
+    if roi is None:
+        return detect_faces_yolo(
+            frame,
+            get_face_model(),
+            conf_threshold=LIVE_FACE_CONF_THRES,
+            imgsz=ladder.size(LIVE_FACE_DET_SIZE),
+        )
+
+    height, width = frame.shape[:2]
+    image = frame[roi[1] : roi[3], roi[0] : roi[2]]
+    imgsz = ladder.size(LIVE_FACE_ROI_DET_SIZE)
+    with _FACE_MODEL_LOCK:
+        results = get_face_model()(image, conf=LIVE_FACE_CONF_THRES, verbose=False, imgsz=imgsz)
+    xyxy, conf = boxes_from_result(results[0] if results else None)
+    xyxy = xyxy.astype(np.float64) + (roi[0], roi[1], roi[0], roi[1])
+    return Detections.from_boxes(
+        xyxy, conf, width, height, FACE_MIN_AREA_RATIO, FACE_MAX_AREA_RATIO, clamp_origin=True
+    )
+
+
+def detect_live_faces(frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> Detections:
+    """Detect faces in a live frame with a single detector.
+
+    With LIVE_FACE_DETECTOR=scrfd (default) the InsightFace detector is used
+    and each face carries its 5-point landmarks, so the embedding can be
+    computed without detecting again. "yolo" keeps the YOLO face model.
+
+    When `roi` (x1, y1, x2, y2) is given only that region is searched, and
+    the returned boxes, landmarks and area ratios are in full-frame terms.
+    """
+    client = remote_client()
+    if client is not None:
+        return client.call("faces", frame, roi)
+    with span("face_detect"):
+        if LIVE_FACE_DETECTOR == "yolo":
+            return _detect_live_faces_yolo(frame, roi)
+        return _detect_live_faces_scrfd(frame, get_insightface_app(), roi)
+
+
+def live_face_roi(bbox: np.ndarray, width: int, height: int) -> Tuple[int, int, int, int]:
+    """Padded search region around the last face box, clamped to the frame."""
+    x1, y1, x2, y2 = (float(value) for value in bbox[:4])
+    pad = FACE_TRACK_PAD_RATIO * max(x2 - x1, y2 - y1)
+    return (
+        max(0, int(x1 - pad)),
+        max(0, int(y1 - pad)),
+        min(width, int(math.ceil(x2 + pad))),
+        min(height, int(math.ceil(y2 + pad))),
+    )
+
+
+def embed_live_face(frame: np.ndarray, face: dict) -> Optional[np.ndarray]:
+    client = remote_client()
+    if client is not None:
+        return client.call("embed", frame, face)
+    with span("face_embed"):
+        return _embed_live_face(frame, face)
+
+
+def _embed_live_face(frame: np.ndarray, face: dict) -> Optional[np.ndarray]:
+    app = get_insightface_app()
+    kps = face.get("kps")
+    if kps is not None:
+        recognizer = app.models["recognition"]
+        aligned = face_align.norm_crop(frame, landmark=kps, image_size=recognizer.input_size[0])
+        return normalize_embedding(recognizer.get_feat(aligned).flatten())
+
+    # YOLO boxes have no landmarks: crop and let InsightFace locate the face.
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = face["bbox"]
+    crop = crop_face_from_bbox(frame, face["bbox"], PADDING_RATIO)
+    if crop is None or crop.size == 0:
+        crop = frame[
+            max(0, int(y1)) : min(height, int(y2)),
+            max(0, int(x1)) : min(width, int(x2)),
+        ]
+    insight_face = get_best_face(app, crop) if crop is not None else None
+    if insight_face is None:
+        return None
+    return normalize_embedding(insight_face.embedding)
 
 
 def extract_card_face(
@@ -446,20 +795,24 @@ def extract_card_face(
     """
     if card_image is None or card_image.size == 0:
         return None, None, None
+    client = remote_client()
+    if client is not None:
+        return client.call("card_face", card_image, extract_embedding)
 
     face_model = get_face_model()
     face_crop = None
     bbox = None
 
     # Use extract_upright_face for rotation correction
-    crop_result, meta, error = extract_upright_face(card_image, face_model)
+    with span("card_face_rotations"):
+        crop_result, meta, error = extract_upright_face(card_image, face_model)
     if error or crop_result is None:
         # Fallback: try direct detection without rotation
         faces = detect_faces_yolo(card_image, face_model)
         if not faces:
             return None, None, None
 
-        best_face = max(faces, key=lambda f: (f["score"], f["area_ratio"]))
+        best_face = faces.best()
         bbox = tuple(int(round(value)) for value in best_face["bbox"])[:4]
         bbox = (bbox[0], bbox[1], bbox[2], bbox[3])
         face_crop = crop_face_from_bbox(card_image, best_face["bbox"], PADDING_RATIO)
@@ -478,13 +831,25 @@ def extract_card_face(
 
     # Extract embedding from the face crop using InsightFace
     embedding = None
-    if extract_embedding and face_crop is not None and face_crop.size > 0:
-        try:
-            app = get_insightface_app()
-            insight_face = get_best_face(app, face_crop)
-            if insight_face is not None:
-                embedding = normalize_embedding(insight_face.embedding)
-        except Exception as e:
-            print(f"[extract_card_face] Failed to extract embedding: {e}")
+    if extract_embedding:
+        embedding = card_face_embedding(face_crop)
 
     return face_crop, bbox, embedding
+
+
+def card_face_embedding(face_crop: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Normalized InsightFace embedding of a card face crop, or None."""
+    if face_crop is None or face_crop.size == 0:
+        return None
+    try:
+        client = remote_client()
+        if client is not None:
+            return client.call("card_embedding", face_crop)
+        app = get_insightface_app()
+        with span("card_face_embed"):
+            insight_face = get_best_face(app, face_crop)
+        if insight_face is not None:
+            return normalize_embedding(insight_face.embedding)
+    except Exception as e:
+        print(f"[card_face_embedding] Failed to extract embedding: {e}")
+    return None
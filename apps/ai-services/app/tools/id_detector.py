@@ -1,20 +1,39 @@
 from __future__ import annotations
 
 import os
+import threading
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Tuple
 
 import cv2
 import numpy as np
 import torch
-from ultralytics import YOLO
+
+from app.batching import MicroBatcher
+from app.inference_server import remote_client
+from app.metrics import card_tracker_frames_by_result
+from app.model_registry import registry
+from app.resolution import ladder
+from app.timing import span
+from app.tools.detections import boxes_from_result
+from app.tools.model_backend import is_fork_safe, load_detector, resolve_backend, weight_filename
 
 CONF_THRES = 0.8
 ASPECT_MIN = 1.25
 ASPECT_MAX = 2.1
 MIN_AREA_RATIO = 0.11
-MAX_FRAME_WIDTH = 1280
+MAX_FRAME_WIDTH = int(os.getenv("CARD_FRAME_MAX_WIDTH", "1280"))
+CARD_IMGSZ = int(os.getenv("CARD_IMGSZ", "640"))
+CARD_BATCH_MAX_SIZE = int(os.getenv("AI_CARD_BATCH_MAX_SIZE", "4"))
+CARD_BATCH_MAX_WAIT_MS = float(os.getenv("AI_CARD_BATCH_MAX_WAIT_MS", "4"))
+CARD_TRACKING = os.getenv("CARD_TRACKING", "on").strip().lower() == "on"
+CARD_TRACK_DETECT_EVERY = int(os.getenv("CARD_TRACK_DETECT_EVERY", "3"))
+CARD_TRACK_MIN_POINTS = int(os.getenv("CARD_TRACK_MIN_POINTS", "12"))
+CARD_TRACK_MIN_INLIER_RATIO = float(os.getenv("CARD_TRACK_MIN_INLIER_RATIO", "0.6"))
+CARD_TRACK_WIDTH = 320
+CARD_TRACK_FB_ERROR = 1.0
 
 
 @dataclass
@@ -28,18 +47,26 @@ class FrameDetection:
     frame_height: int
 
 
-def _resolve_model_path() -> Path:
+def _env_model_path() -> Optional[Path]:
     env_path = os.getenv("AI_MODEL_PATH")
     if env_path:
         return Path(env_path).expanduser().resolve()
+    return None
+
+
+def _resolve_model_path(backend: str) -> Path:
+    env_path = _env_model_path()
+    if env_path:
+        return env_path
 
     base_dir = Path(__file__).resolve().parents[2]  # apps/ai-services
+    filename = weight_filename("card", backend)
     candidates = [
-        base_dir / "models" / "card.pt",
-        base_dir / "card.pt",
-        base_dir / "yolov8_small.pt",
-        base_dir.parent.parent / "models" / "card.pt",
-        base_dir.parent.parent / "card.pt",
+        base_dir / "models" / filename,
+        base_dir / filename,
+        base_dir / weight_filename("yolov8_small", backend),
+        base_dir.parent.parent / "models" / filename,
+        base_dir.parent.parent / filename,
     ]
     for path in candidates:
         if path.exists():
@@ -59,14 +86,34 @@ def _resolve_device() -> str:
     return "cpu"
 
 
-MODEL_PATH = _resolve_model_path()
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(
-        f"YOLO model not found at {MODEL_PATH}. Set AI_MODEL_PATH to your weights."
-    )
+def _load_card_model():
+    backend = resolve_backend("AI_MODEL_BACKEND", _env_model_path())
+    model_path = _resolve_model_path(backend)
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"YOLO model not found at {model_path}. Set AI_MODEL_PATH to your weights."
+        )
+    return load_detector(model_path, _resolve_device(), backend)
+
 
-DEVICE = _resolve_device()
-MODEL = YOLO(str(MODEL_PATH)).to(DEVICE)
+def _warmup_card_model(model) -> None:
+    dummy = np.zeros((720, MAX_FRAME_WIDTH, 3), dtype=np.uint8)
+    with MODEL_LOCK:
+        model(dummy, conf=CONF_THRES, verbose=False, imgsz=CARD_IMGSZ)
+
+
+def get_card_model():
+    return registry.get("card")
+
+
+# Ultralytics predictors are not safe to call from several executor threads at once.
+MODEL_LOCK = threading.Lock()
+registry.register(
+    "card",
+    _load_card_model,
+    _warmup_card_model,
+    fork_safe=is_fork_safe("AI_MODEL_BACKEND", _env_model_path(), _resolve_device()),
+)
 
 
 def _resize_frame(frame: np.ndarray) -> np.ndarray:
@@ -78,59 +125,239 @@ def _resize_frame(frame: np.ndarray) -> np.ndarray:
     return cv2.resize(frame, (MAX_FRAME_WIDTH, resized_height))
 
 
-def process_frame(frame: np.ndarray) -> tuple[FrameDetection, np.ndarray]:
-    frame = _resize_frame(frame)
-    height, width = frame.shape[:2]
+def _detection_from_result(result, width: int, height: int) -> FrameDetection:
+    xyxy, conf = boxes_from_result(result)
+    # int() on a tensor element truncates toward zero, as astype does.
+    return _detection_from_arrays(xyxy.astype(np.int64), conf, width, height)
+
+
+def _detection_from_boxes(
+    boxes: List[Tuple[int, int, int, int, float]], width: int, height: int
+) -> FrameDetection:
+    array = np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+    return _detection_from_arrays(array[:, :4].astype(np.int64), array[:, 4], width, height)
+
+
+def _detection_from_arrays(xyxy: np.ndarray, conf: np.ndarray, width: int, height: int) -> FrameDetection:
+    """Card checks over all boxes at once; xyxy is (N, 4) int64, conf is (N,)."""
     frame_area = max(width * height, 1)
+    box_width = xyxy[:, 2] - xyxy[:, 0]
+    box_height = xyxy[:, 3] - xyxy[:, 1]
+    positive = (box_width > 0) & (box_height > 0)
+    xyxy, conf = xyxy[positive], conf[positive]
+    box_width, box_height = box_width[positive], box_height[positive]
 
-    valid_boxes: List[Tuple[int, int, int, int, float, float]] = []
-    too_small = False
-    best_conf = 0.0
-    best_area_ratio = 0.0
-    best_box: Optional[Tuple[int, int, int, int]] = None
-
-    results = MODEL(frame, conf=CONF_THRES, verbose=False)
-    if results and results[0].boxes is not None:
-        for box in results[0].boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            conf = float(box.conf[0])
-
-            box_width = x2 - x1
-            box_height = y2 - y1
-            if box_width <= 0 or box_height <= 0:
-                continue
-
-            area_ratio = (box_width * box_height) / frame_area
-            if conf > best_conf:
-                best_conf = conf
-                best_area_ratio = area_ratio
-                best_box = (x1, y1, x2, y2)
-
-            aspect_ratio = box_width / box_height
-            if not (ASPECT_MIN <= aspect_ratio <= ASPECT_MAX):
-                continue
-            if area_ratio < MIN_AREA_RATIO:
-                too_small = True
-                continue
-
-            valid_boxes.append((x1, y1, x2, y2, conf, area_ratio))
+    area_ratio = (box_width * box_height) / frame_area
+    aspect_ratio = box_width / box_height
+    aspect_ok = (aspect_ratio >= ASPECT_MIN) & (aspect_ratio <= ASPECT_MAX)
+    large_enough = area_ratio >= MIN_AREA_RATIO
+    too_small = bool(np.any(aspect_ok & ~large_enough))
+    valid = np.flatnonzero(aspect_ok & large_enough)
+
+    valid_boxes: List[Tuple[int, int, int, int, float, float]] = [
+        (
+            int(xyxy[index, 0]),
+            int(xyxy[index, 1]),
+            int(xyxy[index, 2]),
+            int(xyxy[index, 3]),
+            float(conf[index]),
+            float(area_ratio[index]),
+        )
+        for index in valid
+    ]
 
     if valid_boxes:
-        best_valid = max(valid_boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
-        bbox = best_valid[:4]
-        confidence = best_valid[4]
-        area_ratio = best_valid[5]
+        # Largest valid box; argmax keeps the first on ties like max() did.
+        best = valid[int(np.argmax(box_width[valid] * box_height[valid]))]
+    elif len(conf) and conf.max() > 0.0:
+        best = int(np.argmax(conf))
     else:
-        bbox = best_box
-        confidence = best_conf
-        area_ratio = best_area_ratio
+        best = None
+
+    if best is None:
+        bbox, confidence, best_area_ratio = None, 0.0, 0.0
+    else:
+        bbox = tuple(int(value) for value in xyxy[best])
+        confidence = float(conf[best])
+        best_area_ratio = float(area_ratio[best])
 
     return FrameDetection(
         bbox=bbox,
         confidence=confidence,
-        area_ratio=area_ratio,
+        area_ratio=best_area_ratio,
         valid_boxes=valid_boxes,
         too_small=too_small,
         frame_width=width,
         frame_height=height,
-    ), frame
+    )
+
+
+def detect_batch(frames: List[np.ndarray]) -> List[FrameDetection]:
+    """Run the card model once over already-resized frames."""
+    if not frames:
+        return []
+    model = get_card_model()
+    # Boxes come back in source pixels, so payload coordinates do not depend on imgsz.
+    imgsz = ladder.size(CARD_IMGSZ)
+    with span("card_inference"), MODEL_LOCK:
+        results = model(frames, conf=CONF_THRES, verbose=False, imgsz=imgsz)
+    detections = []
+    with span("card_postprocess"):
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            result = results[index] if results and index < len(results) else None
+            detections.append(_detection_from_result(result, width, height))
+    return detections
+
+
+@lru_cache(maxsize=1)
+def get_card_batcher() -> MicroBatcher[np.ndarray, FrameDetection]:
+    return MicroBatcher(
+        "card",
+        detect_batch,
+        max_batch=CARD_BATCH_MAX_SIZE,
+        max_wait=CARD_BATCH_MAX_WAIT_MS / 1000.0,
+    )
+
+
+def _detect(frame: np.ndarray) -> FrameDetection:
+    client = remote_client()
+    if client is not None:
+        # The card process batches whatever is queued when it picks a frame up.
+        return client.call("card", frame)
+    if CARD_BATCH_MAX_SIZE > 1:
+        # Blocks this executor thread until the shared batch containing the frame has run.
+        with span("card_batch"):
+            return get_card_batcher().submit(frame).result()
+    return detect_batch([frame])[0]
+
+
+def process_frame(
+    frame: np.ndarray, tracker: Optional["CardTracker"] = None
+) -> tuple[FrameDetection, np.ndarray]:
+    with span("resize"):
+        frame = _resize_frame(frame)
+    if tracker is None or not CARD_TRACKING:
+        return _detect(frame), frame
+
+    with span("card_track"):
+        detection = tracker.track(frame)
+    if detection is None:
+        detection = _detect(frame)
+        with span("card_track"):
+            tracker.observe(frame, detection)
+    return detection, frame
+
+
+class CardTracker:
+    """Follows a detected card with sparse optical flow between full detections.
+
+    After a detection with a valid card, up to CARD_TRACK_DETECT_EVERY - 1
+    following frames are answered by moving the detected boxes with the
+    similarity transform estimated from LK flow inside the card. Too few
+    flow points, a poor RANSAC fit or a box that no longer passes the card
+    checks hands the frame back to the model.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._gray: Optional[np.ndarray] = None
+        self._scale = 1.0
+        self._detection: Optional[FrameDetection] = None
+        self._tracked = 0
+
+    def observe(self, frame: np.ndarray, detection: FrameDetection) -> None:
+        self._gray, self._scale = self._track_gray(frame)
+        self._detection = detection if detection.valid_boxes else None
+        self._tracked = 0
+
+    def track(self, frame: np.ndarray) -> Optional[FrameDetection]:
+        previous = self._detection
+        if previous is None or self._tracked + 1 >= CARD_TRACK_DETECT_EVERY:
+            card_tracker_frames_by_result["detect"].inc()
+            return None
+
+        gray, scale = self._track_gray(frame)
+        # Frames of different sizes can shrink to the same tracking size: compare the scale too.
+        if self._gray is None or gray.shape != self._gray.shape or scale != self._scale:
+            card_tracker_frames_by_result["lost"].inc()
+            return None
+
+        transform = self._estimate_transform(self._gray, gray, previous.bbox, scale)
+        detection = None
+        if transform is not None:
+            height, width = frame.shape[:2]
+            boxes = [
+                self._transform_box(box, transform, scale, width, height)
+                for box in previous.valid_boxes
+            ]
+            detection = _detection_from_boxes(boxes, width, height)
+        if detection is None or not detection.valid_boxes:
+            card_tracker_frames_by_result["lost"].inc()
+            return None
+
+        card_tracker_frames_by_result["tracked"].inc()
+        self._gray = gray
+        self._detection = detection
+        self._tracked += 1
+        return detection
+
+    @staticmethod
+    def _track_gray(frame: np.ndarray) -> tuple[np.ndarray, float]:
+        height, width = frame.shape[:2]
+        scale = min(1.0, CARD_TRACK_WIDTH / float(width))
+        small = frame
+        if scale < 1.0:
+            small = cv2.resize(frame, (CARD_TRACK_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scale
+
+    @staticmethod
+    def _estimate_transform(
+        prev_gray: np.ndarray,
+        gray: np.ndarray,
+        bbox: Optional[Tuple[int, int, int, int]],
+        scale: float,
+    ) -> Optional[np.ndarray]:
+        if bbox is None:
+            return None
+        mask = np.zeros_like(prev_gray)
+        x1, y1, x2, y2 = (int(round(value * scale)) for value in bbox)
+        mask[max(0, y1) : max(0, y2), max(0, x1) : max(0, x2)] = 255
+        points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=80, qualityLevel=0.01, minDistance=5, mask=mask)
+        if points is None or len(points) < CARD_TRACK_MIN_POINTS:
+            return None
+
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, moved, None)
+        fb_error = np.linalg.norm((points - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < CARD_TRACK_FB_ERROR)
+        if int(good.sum()) < CARD_TRACK_MIN_POINTS:
+            return None
+
+        transform, inliers = cv2.estimateAffinePartial2D(points[good], moved[good], method=cv2.RANSAC)
+        if transform is None or inliers is None:
+            return None
+        if float(inliers.mean()) < CARD_TRACK_MIN_INLIER_RATIO:
+            return None
+        return transform
+
+    @staticmethod
+    def _transform_box(
+        box: Tuple[int, int, int, int, float, float],
+        transform: np.ndarray,
+        scale: float,
+        width: int,
+        height: int,
+    ) -> Tuple[int, int, int, int, float]:
+        x1, y1, x2, y2, conf = box[:5]
+        corners = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32) * scale
+        moved = cv2.transform(corners[None], transform)[0] / scale
+        return (
+            max(0, int(moved[:, 0].min())),
+            max(0, int(moved[:, 1].min())),
+            min(width, int(moved[:, 0].max())),
+            min(height, int(moved[:, 1].max())),
+            conf,
+        )
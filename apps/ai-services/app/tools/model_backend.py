@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+ONNX_DEFAULT_IMGSZ = 640
+ONNX_IOU_THRES = 0.7
+ONNX_MAX_DET = 300
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def resolve_backend(env_name: str, model_path: Optional[Path] = None) -> str:
+    """Backend from e.g. AI_MODEL_BACKEND, falling back to the weight file suffix."""
+    env_backend = (os.getenv(env_name) or "").strip().lower()
+    if env_backend:
+        if env_backend not in BACKENDS:
+            raise ValueError(f"{env_name} must be one of {', '.join(BACKENDS)}, got {env_backend!r}")
+        return env_backend
+    if model_path is not None:
+        return backend_for_path(model_path)
+    return BACKEND_TORCH
+
+
+def is_fork_safe(env_name: str, model_path: Optional[Path] = None, device: str = "cpu") -> bool:
+    """Torch weights on the CPU can be loaded before forking workers.
+
+    onnxruntime sessions cannot, and neither can weights on a GPU: a forked
+    child cannot use the CUDA or MPS context its parent created.
+    """
+    if device != "cpu":
+        return False
+    try:
+        return resolve_backend(env_name, model_path) == BACKEND_TORCH
+    except ValueError:
+        # Reported when the model is loaded.
+        return False
+
+
+def backend_for_path(model_path: Path) -> str:
+    if model_path.suffix != ".onnx":
+        return BACKEND_TORCH
+    return BACKEND_ONNX_INT8 if model_path.name.endswith(".int8.onnx") else BACKEND_ONNX
+
+
+def weight_filename(stem: str, backend: str) -> str:
+    if backend == BACKEND_ONNX:
+        return f"{stem}.onnx"
+    if backend == BACKEND_ONNX_INT8:
+        return f"{stem}.int8.onnx"
+    return f"{stem}.pt"
+
+
+def onnx_providers(device: str) -> List[str]:
+    available = ort.get_available_providers()
+    if device.startswith("cuda") and "CUDAExecutionProvider" in available:
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    return ["CPUExecutionProvider"]
+
+
+def load_detector(model_path: Path, device: str, backend: str):
+    if backend == BACKEND_TORCH:
+        from ultralytics import YOLO
+
+        return YOLO(str(model_path)).to(device)
+    return OnnxDetector(model_path, providers=onnx_providers(device))
+
+
+def letterbox(image: np.ndarray, size: int) -> tuple[np.ndarray, float, float, float]:
+    height, width = image.shape[:2]
+    ratio = min(size / float(height), size / float(width))
+    new_width = int(round(width * ratio))
+    new_height = int(round(height * ratio))
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x = (size - new_width) / 2.0
+    pad_y = (size - new_height) / 2.0
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    canvas = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return canvas, ratio, float(left), float(top)
+
+
+def preprocess(images: Sequence[np.ndarray], size: int) -> tuple[np.ndarray, list]:
+    """Letterbox BGR images into an NCHW float32 RGB batch scaled to 0-1."""
+    prepared = [letterbox(image, size) for image in images]
+    blob = np.stack([canvas for canvas, _, _, _ in prepared])
+    blob = np.ascontiguousarray(blob[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+    return blob, prepared
+
+
+class OnnxBox:
+    __slots__ = ("xyxy", "conf")
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray) -> None:
+        self.xyxy = xyxy
+        self.conf = conf
+
+
+class OnnxBoxes:
+    """Minimal stand-in for ultralytics `Boxes` so existing post-processing works unchanged."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray) -> None:
+        self.xyxy = xyxy
+        self.conf = conf
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __iter__(self):
+        for index in range(len(self.conf)):
+            yield OnnxBox(self.xyxy[index : index + 1], self.conf[index : index + 1])
+
+
+class OnnxResult:
+    def __init__(self, boxes: OnnxBoxes) -> None:
+        self.boxes = boxes
+
+
+class OnnxDetector:
+    """Exported YOLOv8 detector (FP32 or static INT8) run through onnxruntime.
+
+    Called like an ultralytics model: `detector(image_or_images, conf=..., verbose=False)`
+    returns one result per image with `.boxes.xyxy` / `.boxes.conf` in source pixels.
+    """
+
+    def __init__(self, model_path: Path, providers: Optional[List[str]] = None) -> None:
+        self.model_path = Path(model_path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(self.model_path),
+            sess_options=options,
+            providers=providers or ["CPUExecutionProvider"],
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+        batch_dim, _, height_dim, _ = model_input.shape
+        self.imgsz = height_dim if isinstance(height_dim, int) else ONNX_DEFAULT_IMGSZ
+        self.dynamic_size = not isinstance(height_dim, int)
+        self.dynamic_batch = not isinstance(batch_dim, int)
+
+    def __call__(
+        self,
+        source: Union[np.ndarray, Sequence[np.ndarray]],
+        conf: float = 0.25,
+        iou: float = ONNX_IOU_THRES,
+        verbose: bool = False,
+        imgsz: Optional[int] = None,
+    ) -> List[OnnxResult]:
+        images = [source] if isinstance(source, np.ndarray) else list(source)
+        if not images:
+            return []
+        # Exports with a fixed input shape ignore imgsz.
+        size = imgsz if imgsz and self.dynamic_size else self.imgsz
+        blob, prepared = preprocess(images, size)
+
+        if self.dynamic_batch or len(images) == 1:
+            outputs = self.session.run([self.output_name], {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate(
+                [
+                    self.session.run([self.output_name], {self.input_name: blob[index : index + 1]})[0]
+                    for index in range(len(images))
+                ]
+            )
+
+        results = []
+        for output, image, (_, ratio, pad_x, pad_y) in zip(outputs, images, prepared):
+            height, width = image.shape[:2]
+            results.append(self._postprocess(output, conf, iou, ratio, pad_x, pad_y, width, height))
+        return results
+
+    @staticmethod
+    def _postprocess(
+        output: np.ndarray,
+        conf: float,
+        iou: float,
+        ratio: float,
+        pad_x: float,
+        pad_y: float,
+        width: int,
+        height: int,
+    ) -> OnnxResult:
+        # YOLOv8 head: (4 + num_classes, anchors) with cx, cy, w, h in letterboxed pixels.
+        predictions = output.T
+        scores = predictions[:, 4:].max(axis=1)
+        keep = scores >= conf
+        predictions = predictions[keep]
+        scores = scores[keep]
+        if scores.size == 0:
+            empty = np.zeros((0, 4), dtype=np.float32)
+            return OnnxResult(OnnxBoxes(empty, np.zeros((0,), dtype=np.float32)))
+
+        cx, cy, bw, bh = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+        xywh = np.stack([boxes[:, 0], boxes[:, 1], boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf, iou)
+        indices = np.array(indices, dtype=np.int64).reshape(-1)[:ONNX_MAX_DET]
+        return OnnxResult(
+            OnnxBoxes(boxes[indices].astype(np.float32), scores[indices].astype(np.float32))
+        )
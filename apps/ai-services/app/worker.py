@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.metrics import PROMETHEUS_MULTIPROC_DIR, multiprocess_registry, worker_memory_bytes
+
+WORKER_ID = os.getenv("AI_WORKER_ID", "0")
+WORKER_METRICS_INTERVAL_SEC = float(os.getenv("AI_WORKER_METRICS_INTERVAL_SEC", "15"))
+
+_sessions = 0
+_refresher: Optional[threading.Thread] = None
+
+
+def session_opened() -> None:
+    global _sessions
+    _sessions += 1
+
+
+def session_closed() -> None:
+    global _sessions
+    _sessions -= 1
+
+
+def active_sessions() -> int:
+    return _sessions
+
+
+def memory_usage() -> Dict[str, int]:
+    """Resident, proportional (shared pages split between processes) and shared bytes."""
+    usage: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as handle:
+            for line in handle:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    usage[key] = int(rest.split()[0]) * 1024
+    except OSError:
+        # Not Linux: only the peak RSS is available (bytes on macOS, KiB elsewhere).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": peak if os.uname().sysname == "Darwin" else peak * 1024}
+    return {
+        "rss": usage.get("Rss", 0),
+        "pss": usage.get("Pss", 0),
+        "shared": usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0),
+    }
+
+
+def update_worker_metrics() -> Dict[str, int]:
+    usage = memory_usage()
+    for kind, value in usage.items():
+        worker_memory_bytes.labels(kind).set(value)
+    return usage
+
+
+def _refresh_loop() -> None:
+    while True:
+        update_worker_metrics()
+        time.sleep(WORKER_METRICS_INTERVAL_SEC)
+
+
+def start_metrics_refresh() -> None:
+    """Keep this worker's gauges current even when other workers answer the scrapes."""
+    global _refresher
+    if _refresher is not None or WORKER_METRICS_INTERVAL_SEC <= 0:
+        return
+    _refresher = threading.Thread(target=_refresh_loop, name="worker-metrics", daemon=True)
+    _refresher.start()
+
+
+def worker_info() -> Dict[str, object]:
+    return {
+        "worker": WORKER_ID,
+        "pid": os.getpid(),
+        "sessions": active_sessions(),
+        "memory": update_worker_metrics(),
+    }
+
+
+def all_workers() -> List[Dict[str, object]]:
+    """Sessions and memory of every live worker, as last published to the shared metrics."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return [{"pid": os.getpid(), "sessions": active_sessions(), "memory": update_worker_metrics()}]
+    update_worker_metrics()
+    sessions: Dict[str, int] = {}
+    memory: Dict[str, Dict[str, int]] = {}
+    for family in multiprocess_registry().collect():
+        for sample in family.samples:
+            pid = sample.labels.get("pid")
+            if sample.name == "ai_ws_active_connections_per_worker":
+                sessions[pid] = int(sample.value)
+            elif sample.name == "ai_worker_memory_bytes":
+                memory.setdefault(pid, {})[sample.labels["kind"]] = int(sample.value)
+    # Only API workers publish memory; inference processes also carry a zero connections gauge.
+    return [
+        {"pid": int(pid), "sessions": sessions.get(pid, 0), "memory": memory[pid]}
+        for pid in sorted(memory, key=int)
+    ]
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from app.batching import MicroBatcher
+
+
+def _recording_batcher(max_wait, gate=None):
+    batches = []
+
+    def run_batch(items):
+        if gate is not None:
+            gate.wait()
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    return MicroBatcher("test", run_batch, max_batch=4, max_wait=max_wait), batches
+
+
+def test_a_lone_item_does_not_wait_for_a_batch():
+    batcher, batches = _recording_batcher(max_wait=1.0)
+
+    start = time.perf_counter()
+    assert batcher.submit(3).result(timeout=1.0) == 6
+    assert time.perf_counter() - start < 0.5
+    assert batches == [[3]]
+
+
+def test_items_queued_while_a_batch_runs_share_the_next_batch():
+    gate = threading.Event()
+    batcher, batches = _recording_batcher(max_wait=0.05, gate=gate)
+
+    first = batcher.submit(1)
+    time.sleep(0.05)
+    rest = [batcher.submit(item) for item in (2, 3, 4)]
+    gate.set()
+
+    assert first.result(timeout=1.0) == 2
+    assert [future.result(timeout=1.0) for future in rest] == [4, 6, 8]
+    assert batches == [[1], [2, 3, 4]]
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from app.tools.id_detector import (
+    ASPECT_MAX,
+    ASPECT_MIN,
+    MIN_AREA_RATIO,
+    FrameDetection,
+    _detection_from_boxes,
+    _detection_from_result,
+)
+from app.tools.model_backend import OnnxBoxes
+
+
+def _reference_detection(boxes: List[Tuple[int, int, int, int, float]], width: int, height: int) -> FrameDetection:
+    # The per-box loop _detection_from_arrays replaced.
+    frame_area = max(width * height, 1)
+    valid_boxes = []
+    too_small = False
+    best_conf = 0.0
+    best_area_ratio = 0.0
+    best_box: Optional[Tuple[int, int, int, int]] = None
+    for x1, y1, x2, y2, conf in boxes:
+        box_width = x2 - x1
+        box_height = y2 - y1
+        if box_width <= 0 or box_height <= 0:
+            continue
+        area_ratio = (box_width * box_height) / frame_area
+        if conf > best_conf:
+            best_conf = conf
+            best_area_ratio = area_ratio
+            best_box = (x1, y1, x2, y2)
+        aspect_ratio = box_width / box_height
+        if not (ASPECT_MIN <= aspect_ratio <= ASPECT_MAX):
+            continue
+        if area_ratio < MIN_AREA_RATIO:
+            too_small = True
+            continue
+        valid_boxes.append((x1, y1, x2, y2, conf, area_ratio))
+    if valid_boxes:
+        best_valid = max(valid_boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+        bbox, confidence, area_ratio = best_valid[:4], best_valid[4], best_valid[5]
+    else:
+        bbox, confidence, area_ratio = best_box, best_conf, best_area_ratio
+    return FrameDetection(bbox, confidence, area_ratio, valid_boxes, too_small, width, height)
+
+
+def _random_boxes(rng: np.random.Generator, count: int, width: int, height: int) -> list:
+    boxes = []
+    for _ in range(count):
+        x1, y1 = int(rng.integers(-20, width)), int(rng.integers(-20, height))
+        x2, y2 = x1 + int(rng.integers(-10, width)), y1 + int(rng.integers(-10, height))
+        # Rounded scores so equal confidences and equal areas both come up.
+        boxes.append((x1, y1, x2, y2, round(float(rng.uniform(0.0, 1.0)), 1)))
+    return boxes
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_vectorized_card_checks_match_the_box_loop(seed):
+    rng = np.random.default_rng(seed)
+    width, height = 640, 480
+    boxes = _random_boxes(rng, int(rng.integers(0, 8)), width, height)
+    # Duplicated boxes check that ties keep the first one.
+    boxes += boxes[: int(rng.integers(0, 3))]
+
+    assert _detection_from_boxes(boxes, width, height) == _reference_detection(boxes, width, height)
+
+
+def test_result_boxes_are_truncated_like_the_box_loop():
+    xyxy = np.array([[10.9, 20.5, 410.7, 300.2], [-3.5, 5.9, 200.99, 100.01]], dtype=np.float32)
+    conf = np.array([0.91, 0.85], dtype=np.float32)
+    result = SimpleNamespace(boxes=OnnxBoxes(xyxy, conf))
+    # The loop read each box with int(box.xyxy[0][i]) and float(box.conf[0]).
+    boxes = [(*(int(value) for value in box), float(score)) for box, score in zip(xyxy, conf)]
+
+    assert _detection_from_result(result, 640, 480) == _reference_detection(boxes, 640, 480)
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.tools import id_detector
+from app.tools.id_detector import CardTracker, _detection_from_boxes
+
+
+def _card_scene(texture: np.ndarray, shift: int = 0) -> np.ndarray:
+    frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+    frame[100:340, 100 + shift : 500 + shift] = texture
+    return frame
+
+
+@pytest.fixture
+def texture():
+    noise = np.random.default_rng(1).integers(0, 255, (240, 400, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (5, 5), 0)
+
+
+@pytest.fixture
+def tracker(texture, monkeypatch):
+    monkeypatch.setattr(id_detector, "CARD_TRACK_DETECT_EVERY", 3)
+    tracker = CardTracker()
+    tracker.observe(_card_scene(texture), _detection_from_boxes([(100, 100, 500, 340, 0.95)], 640, 480))
+    return tracker
+
+
+def test_tracker_follows_a_moving_card(tracker, texture):
+    detection = tracker.track(_card_scene(texture, shift=6))
+
+    assert detection is not None
+    assert detection.confidence == 0.95
+    assert np.allclose(detection.bbox, (106, 100, 506, 340), atol=2)
+
+
+def test_tracker_returns_none_when_the_card_is_lost(tracker):
+    assert tracker.track(np.full((480, 640, 3), 90, dtype=np.uint8)) is None
+
+
+def test_tracker_returns_none_when_the_frame_size_changes(tracker, texture):
+    assert tracker.track(cv2.resize(_card_scene(texture), (320, 240))) is None
+
+
+def test_tracker_hands_back_to_the_model_after_detect_every(tracker, texture):
+    assert tracker.track(_card_scene(texture, shift=2)) is not None
+    assert tracker.track(_card_scene(texture, shift=4)) is not None
+    assert tracker.track(_card_scene(texture, shift=6)) is None
+
+
+def test_tracker_does_not_follow_a_frame_without_a_card(texture):
+    tracker = CardTracker()
+    tracker.observe(_card_scene(texture), _detection_from_boxes([], 640, 480))
+
+    assert tracker.track(_card_scene(texture)) is None
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from app.gating import FrameGate
+from app.routers.id_verification import _process_frame_bytes
+from app.state import VerificationPayload
+
+
+class _FaceStageState:
+    """Locked session in the face stage whose next processed frame fails validation."""
+
+    def __init__(self):
+        self.state = "LOCKED"
+        self.locked_payload = SimpleNamespace()
+        self.face_validation_done = False
+        self.face_payload = None
+        self.calls = 0
+
+    def update_face(self, frame):
+        self.calls += 1
+        return VerificationPayload(
+            state="LOCKED",
+            bbox=None,
+            confidence=0.0,
+            area_ratio=0.0,
+            frame_width=frame.shape[1],
+            frame_height=frame.shape[0],
+            too_small=False,
+            face_detected=True,
+            face_similarity=0.12,
+            validation_failed=True,
+        )
+
+
+def test_skipped_face_frames_do_not_repeat_one_shot_fields():
+    state, gate = _FaceStageState(), FrameGate()
+    frame_bytes = cv2.imencode(".jpg", np.full((120, 160, 3), 90, dtype=np.uint8))[1].tobytes()
+
+    stage, _, processed = _process_frame_bytes(state, gate, frame_bytes)
+    assert stage == "face" and processed.validation_failed and processed.face_similarity == 0.12
+
+    stage, _, skipped = _process_frame_bytes(state, gate, frame_bytes)
+    assert stage == "skipped" and state.calls == 1
+    assert not skipped.validation_failed and skipped.face_similarity is None
+    assert skipped.face_detected
+    assert processed.validation_failed
@@ -0,0 +1,116 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.inference_server import KIND_MODELS, FrameRing, InferenceClient, InferenceUnavailable
+
+SLOTS = 2
+SLOT_BYTES = 64 * 64 * 3
+TIMEOUT = 1.0
+
+
+# Stand-ins for app.inference_server._serve: same arguments, no models.
+def _ready(kind, replies):
+    status = {name: {"state": "warm", "load_seconds": 0.0, "error": None} for name in KIND_MODELS[kind]}
+    replies.send((None, True, status))
+
+
+def _sum_server(kind, ring_name, slots, slot_bytes, requests, replies, parent):
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+    _ready(kind, replies)
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        request_id, _, slot, shape, _, _ = item
+        replies.send((request_id, True, int(ring.view(slot, shape).sum())))
+
+
+def _hanging_server(kind, ring_name, slots, slot_bytes, requests, replies, parent):
+    _ready(kind, replies)
+    while requests.get() is not None:
+        pass
+
+
+def _crashing_server(kind, ring_name, slots, slot_bytes, requests, replies, parent):
+    _ready(kind, replies)
+    if requests.get() is not None:
+        os._exit(3)
+
+
+def _wait_ready(client, deadline=30.0):
+    end = time.monotonic() + deadline
+    while not client.is_ready():
+        assert time.monotonic() < end, "inference processes never became ready"
+        time.sleep(0.05)
+
+
+def _wait_free_slots(client, deadline=10.0):
+    end = time.monotonic() + deadline
+    while client._free.qsize() < SLOTS:
+        assert time.monotonic() < end, "slots were not returned to the ring"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(target):
+        client = InferenceClient(1, 1, SLOTS, SLOT_BYTES, timeout=TIMEOUT, target=target)
+        clients.append(client)
+        _wait_ready(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.shutdown()
+
+
+def test_call_returns_result(make_client):
+    client = make_client(_sum_server)
+    frame = np.ones((8, 8, 3), dtype=np.uint8)
+    assert client.call("card", frame) == 8 * 8 * 3
+    assert client._free.qsize() == SLOTS
+
+
+def test_timeouts_do_not_leak_slots(make_client):
+    client = make_client(_hanging_server)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pids = set()
+    # More timeouts than slots: each must fail as a timeout, not as "no free slot".
+    for _ in range(SLOTS + 1):
+        _wait_ready(client)
+        pids.add(client._workers[0].process.pid)
+        with pytest.raises(InferenceUnavailable, match="timed out"):
+            client.call("card", frame)
+    _wait_free_slots(client)
+    # The hung process was terminated and replaced each time.
+    assert len(pids) == SLOTS + 1
+
+
+def test_dead_process_fails_fast_and_is_replaced(make_client):
+    client = make_client(_crashing_server)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pid = client._workers[0].process.pid
+    start = time.monotonic()
+    with pytest.raises(InferenceUnavailable, match="exited"):
+        client.call("card", frame)
+    assert time.monotonic() - start < TIMEOUT
+    _wait_free_slots(client)
+    _wait_ready(client)
+    assert client._workers[0].process.pid != pid
+
+
+def test_call_fails_fast_while_not_ready(make_client):
+    client = make_client(_crashing_server)
+    with pytest.raises(InferenceUnavailable):
+        client.call("card", np.zeros((8, 8, 3), dtype=np.uint8))
+    # The replacement is still starting: no waiting for the timeout.
+    start = time.monotonic()
+    if not client._workers[0].ready:
+        with pytest.raises(InferenceUnavailable, match="ready"):
+            client.call("card", np.zeros((8, 8, 3), dtype=np.uint8))
+    assert time.monotonic() - start < TIMEOUT
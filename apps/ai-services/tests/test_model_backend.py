@@ -0,0 +1,12 @@
+from pathlib import Path
+
+from app.tools.model_backend import is_fork_safe
+
+
+def test_only_cpu_torch_weights_are_fork_safe(monkeypatch):
+    monkeypatch.delenv("AI_MODEL_BACKEND", raising=False)
+
+    assert is_fork_safe("AI_MODEL_BACKEND", Path("card.pt"), "cpu")
+    assert not is_fork_safe("AI_MODEL_BACKEND", Path("card.pt"), "cuda")
+    assert not is_fork_safe("AI_MODEL_BACKEND", Path("card.pt"), "mps")
+    assert not is_fork_safe("AI_MODEL_BACKEND", Path("card.onnx"), "cpu")
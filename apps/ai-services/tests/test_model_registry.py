@@ -0,0 +1,43 @@
+import pytest
+
+from app import model_registry
+from app.model_registry import STATE_FAILED, STATE_WARM, ModelRegistry
+
+
+def test_failed_load_is_retried_after_backoff(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(model_registry.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(model_registry, "MODEL_RETRY_SEC", 10.0)
+    attempts = []
+
+    def loader():
+        attempts.append(now[0])
+        if len(attempts) < 3:
+            raise FileNotFoundError("weights missing")
+        return "model"
+
+    registry = ModelRegistry()
+    registry.register("card", loader)
+
+    with pytest.raises(RuntimeError):
+        registry.get("card")
+    now[0] += 5.0
+    with pytest.raises(RuntimeError):
+        registry.get("card")
+    assert len(attempts) == 1
+
+    now[0] += 5.0
+    with pytest.raises(RuntimeError):
+        registry.get("card")
+    assert len(attempts) == 2
+    assert registry.status()["card"]["state"] == STATE_FAILED
+
+    # The second failure doubles the wait.
+    now[0] += 10.0
+    with pytest.raises(RuntimeError):
+        registry.get("card")
+    now[0] += 10.0
+    assert registry.get("card") == "model"
+    assert len(attempts) == 3
+    assert registry.status()["card"] == {"state": STATE_WARM, "load_seconds": 0.0, "error": None}
+    assert registry.is_ready()
@@ -0,0 +1,33 @@
+import json
+
+from app.responses import ResponseEncoder
+
+
+def test_crops_are_repeated_by_default():
+    encoder = ResponseEncoder()
+    message = {"type": "LOCKED", "crop": "abc"}
+
+    assert json.loads(encoder.encode(message)) == message
+    assert json.loads(encoder.encode(message)) == message
+
+
+def test_crop_once_drops_crops_already_sent():
+    encoder = ResponseEncoder()
+    encoder.configure(["crop-once"])
+    assert json.loads(encoder.hello())["crop_once"] is True
+
+    assert json.loads(encoder.encode({"type": "LOCKED", "crop": "abc"})) == {"type": "LOCKED", "crop": "abc"}
+    assert json.loads(encoder.encode({"type": "LOCKED", "crop": "abc"})) == {"type": "LOCKED"}
+    assert json.loads(encoder.encode({"type": "LOCKED", "crop": "xyz"})) == {"type": "LOCKED", "crop": "xyz"}
+
+    encoder.reset()
+    assert json.loads(encoder.encode({"type": "LOCKED", "crop": "abc"})) == {"type": "LOCKED", "crop": "abc"}
+
+
+def test_hello_without_crop_once_turns_it_off():
+    encoder = ResponseEncoder()
+    encoder.configure(["crop-once"])
+    encoder.encode({"crop": "abc"})
+    encoder.configure([])
+
+    assert json.loads(encoder.encode({"crop": "abc"})) == {"crop": "abc"}
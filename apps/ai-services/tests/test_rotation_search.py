@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.tools import face_validation
+from app.tools.face_validation import (
+    content_bbox,
+    find_best_rotation_yolo,
+    find_best_rotation_yolo_sequential,
+    rotate_for_search,
+    rotate_image,
+)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = xyxy
+        self.conf = conf
+
+    def __len__(self):
+        return len(self.conf)
+
+
+def _marker_result(image):
+    # The red marker is the "face"; its score drops when rotation blurs its edges.
+    mask = (image[:, :, 2] > 200) & (image[:, :, 0] < 60)
+    if not mask.any():
+        return SimpleNamespace(boxes=_Boxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32)))
+    ys, xs = np.where(mask)
+    box = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=np.float32)
+    fill = mask.sum() / float((box[0, 2] - box[0, 0]) * (box[0, 3] - box[0, 1]))
+    return SimpleNamespace(boxes=_Boxes(box, np.array([0.5 + 0.4 * fill], np.float32)))
+
+
+class _MarkerModel:
+    """Stand-in face model that accepts one image or a batch, like ultralytics."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, images, conf=0.0, verbose=False, imgsz=None):
+        self.calls += 1
+        batch = images if isinstance(images, list) else [images]
+        return [_marker_result(image) for image in batch]
+
+
+def _card(marker_at):
+    card = np.full((240, 380, 3), 120, dtype=np.uint8)
+    y, x = marker_at
+    card[y : y + 60, x : x + 44] = (0, 0, 255)
+    return card
+
+
+# rotate_image warps about (w/2, h/2), which lands its quadrant rotations one pixel off the grid.
+QUADRANT_WARP_OFFSET = {0: (0, 0), 90: (1, 0), 180: (1, 1), 270: (0, 1)}
+
+
+@pytest.mark.parametrize("shape", [(240, 380, 3), (241, 379, 3)])
+@pytest.mark.parametrize("angle", [0, 90, 180, 270])
+def test_quadrant_rotation_matches_rotate_image(shape, angle):
+    image = np.random.default_rng(0).integers(20, 255, shape, dtype=np.uint8)
+
+    rotated, content = rotate_for_search(image, angle)
+    reference = rotate_image(image, angle)
+
+    assert rotated.shape == reference.shape
+    dy, dx = QUADRANT_WARP_OFFSET[angle]
+    height, width = rotated.shape[:2]
+    np.testing.assert_array_equal(rotated[: height - dy, : width - dx], reference[dy:, dx:])
+    assert content == (0, 0, width, height)
+    assert content_bbox(reference) == (dx, dy, width, height)
+
+
+@pytest.mark.parametrize("angle", [45, 135, 225, 315])
+def test_diagonal_content_box_covers_the_rotated_pixels(angle):
+    image = np.full((240, 380, 3), 200, dtype=np.uint8)
+
+    rotated, content = rotate_for_search(image, angle)
+
+    assert rotated.shape == rotate_image(image, angle).shape
+    px1, py1, px2, py2 = content_bbox(rotated)
+    x1, y1, x2, y2 = content
+    assert x1 <= px1 and y1 <= py1 and x2 >= px2 and y2 >= py2
+    assert max(px1 - x1, py1 - y1, x2 - px2, y2 - py2) <= 2
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+@pytest.mark.parametrize("marker_at", [(60, 60), (100, 200)])
+def test_batched_and_sequential_search_pick_the_same_rotation(monkeypatch, rotation, marker_at):
+    monkeypatch.setattr(face_validation, "FACE_ROTATION_SEARCH", "full")
+    card, _ = rotate_for_search(_card(marker_at), rotation)
+    batched_model, sequential_model = _MarkerModel(), _MarkerModel()
+
+    batched, batched_error = find_best_rotation_yolo(card, batched_model)
+    sequential, sequential_error = find_best_rotation_yolo_sequential(card, sequential_model)
+
+    assert batched_error is None and sequential_error is None
+    assert batched["angle"] == sequential["angle"]
+    np.testing.assert_array_equal(batched["face"]["bbox"], sequential["face"]["bbox"])
+    assert batched_model.calls == 1
+    assert sequential_model.calls == 360 // face_validation.FACE_ROTATION_STEP_DEG
+
+
+def test_both_searches_report_the_same_failure(monkeypatch):
+    monkeypatch.setattr(face_validation, "FACE_ROTATION_SEARCH", "full")
+    card = np.full((240, 380, 3), 120, dtype=np.uint8)
+
+    assert find_best_rotation_yolo(card, _MarkerModel()) == find_best_rotation_yolo_sequential(card, _MarkerModel())
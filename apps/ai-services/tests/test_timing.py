@@ -0,0 +1,21 @@
+import asyncio
+
+from app.timing import leave_frame, span, start_frame
+
+
+def test_task_that_leaves_the_frame_does_not_add_to_its_breakdown():
+    async def background_reply():
+        leave_frame()
+        with span("send"):
+            pass
+
+    async def handle_frame():
+        timings = start_frame()
+        with span("decode"):
+            pass
+        await asyncio.create_task(background_reply())
+        return timings
+
+    timings = asyncio.run(handle_frame())
+
+    assert set(timings) == {"decode"}
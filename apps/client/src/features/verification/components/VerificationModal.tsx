@@ -110,6 +110,7 @@ type BoundingBox = [number, number, number, number];
 type DetectionStatus = 'SEARCHING' | 'LOCKING' | 'LOCKED' | 'FACE_VALIDATION';
 
 interface WebSocketPayload {
+  type?: string;
   state?: DetectionStatus;
   bbox?: BoundingBox;
   frame?: FrameMeta;
@@ -124,6 +125,7 @@ interface WebSocketPayload {
   matched?: boolean;
   validation_done?: boolean;
   validation_failed?: boolean;
+  face_pending?: boolean;
 }
 
 export default function VerificationModal({
@@ -462,13 +464,29 @@ export default function VerificationModal({
       setWsReady(false);
     };
     ws.onmessage = (event: MessageEvent) => {
-      sendInFlightRef.current = false;
       let payload: WebSocketPayload;
       try {
         payload = JSON.parse(event.data as string);
       } catch {
+        sendInFlightRef.current = false;
         return;
       }
+
+      // Card face extraction finishes after the LOCKED reply; this message
+      // is not a reply to a frame, so it must not release the send slot.
+      if (payload.type === 'CARD_FACE_READY') {
+        setCardFaceCrop(payload.face_crop || null);
+        setCardFaceBbox(payload.face_bbox || null);
+        setNoFaceOnCard(!payload.face_crop);
+        return;
+      }
+      // The server could not process the frame; free the send slot and keep
+      // the current state instead of treating this as a frame result.
+      if (payload.type === 'ERROR') {
+        sendInFlightRef.current = false;
+        return;
+      }
+      sendInFlightRef.current = false;
       setHasReceivedPayload(true);
 
       setStatus(payload.state || 'SEARCHING');
@@ -529,7 +547,7 @@ export default function VerificationModal({
         setCardFaceCrop(payload.face_crop || null);
         setCardFaceBbox(payload.face_bbox || null);
         // Check if no face was detected on the card
-        setNoFaceOnCard(!payload.face_crop);
+        setNoFaceOnCard(!payload.face_crop && !payload.face_pending);
 
         const video = videoRef.current;
         const canvas = captureCanvasRef.current;